@@ -0,0 +1,42 @@
+import os
+import sys
+
+import numpy as np
+
+from harness import ROOT_DIR, benchmark
+
+sys.path.insert(0, os.path.join(ROOT_DIR, 'difference_equations'))
+
+from model import Constants, run_grid, solve, solve_grid, solve_switching  # noqa: E402
+
+# the default values of the sliders in the apps.
+CONSTANTS: Constants = Constants(
+    reproduction_rate=0.5,
+    prey_capacity=100,
+    consumption_rate=0.05,
+    efficiency=0.15,
+    death_rate=0.05,
+)
+
+
+@benchmark('difference_equations.run_grid', repeat=3, grid_size=[0, 2, 5, 10])
+def run_grid_(grid_size: int):
+    return lambda: run_grid(CONSTANTS, time_steps=100, delta_t=0.25, grid_size=grid_size)
+
+
+@benchmark('difference_equations.ode_solve', number=10)
+def ode_solve():
+    time = np.arange(start=0, stop=100, step=0.25)
+    return lambda: solve((3, 1), time, CONSTANTS)
+
+
+@benchmark('difference_equations.ode_solve_switching', number=10)
+def ode_solve_switching():
+    time = np.arange(start=0, stop=100, step=0.25)
+    return lambda: solve_switching((3, 1), time, CONSTANTS)
+
+
+@benchmark('difference_equations.ode_solve_grid', repeat=3, grid_size=[2, 5, 10])
+def ode_solve_grid(grid_size: int):
+    time = np.arange(start=0, stop=100, step=0.25)
+    return lambda: solve_grid(CONSTANTS, time, grid_size)
@@ -0,0 +1,33 @@
+import copy
+import os
+import sys
+
+from harness import ROOT_DIR, benchmark
+
+sys.path.insert(0, os.path.join(ROOT_DIR, 'food_web'))
+
+import food_web  # noqa: E402
+
+# solve_food_web adds humans to the web in place, so every setup starts from a copy of the original web.
+_ORIGINAL = copy.deepcopy((food_web.PARTICIPANTS, food_web.EFFICIENCY, food_web.FOOD_WEB))
+
+
+def _reset_web():
+    participants, efficiency, web = copy.deepcopy(_ORIGINAL)
+    food_web.PARTICIPANTS[:] = participants
+    food_web.EFFICIENCY.clear()
+    food_web.EFFICIENCY.update(efficiency)
+    food_web.FOOD_WEB.clear()
+    food_web.FOOD_WEB.update(web)
+    return
+
+
+@benchmark('food_web.solve_food_web', number=1, repeat=20, include_humans=[False, True])
+def solve_food_web(include_humans: bool):
+    _reset_web()
+    return lambda: food_web.solve_food_web(
+        input_flux=690,
+        include_humans=include_humans,
+        latex=False,
+        draw_web=False,
+    )
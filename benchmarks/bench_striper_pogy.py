@@ -0,0 +1,84 @@
+import os
+import sys
+import tempfile
+from typing import Any, Dict, List
+
+import numpy as np
+
+from harness import ROOT_DIR, SEED, benchmark
+
+sys.path.insert(0, os.path.join(ROOT_DIR, 'striper_pogy'))
+
+from fish import Predator, Prey  # noqa: E402
+from markov import TransitionTable  # noqa: E402
+from params import BOARD_SIZE, PREY_CAPACITY  # noqa: E402
+from simulate import ENGINES, FISH_ENGINES, simulate_once  # noqa: E402
+from utils import Size  # noqa: E402
+
+# number of time steps run before timing, so that the populations are near their usual sizes.
+WARMUP_STEPS: int = 20
+
+# the temporary directory of the table of the markov benchmark being timed. See _table_kwargs.
+_TABLE_DIRECTORIES: List[tempfile.TemporaryDirectory] = list()
+
+
+def _table_kwargs(engine: str, size_multiplier: int) -> Dict[str, Any]:
+    """ A fresh, empty TransitionTable for the markov engine, saved in a new temporary directory.
+
+    Otherwise the markov engine would use, and save to, the tables in striper_pogy/tables, so whether a state is filled
+    or hit would depend on earlier runs. The directory of the previous repeat is removed, since it has been timed.
+    """
+    if engine != 'markov':
+        return dict()
+    while _TABLE_DIRECTORIES:
+        _TABLE_DIRECTORIES.pop().cleanup()
+    directory = tempfile.TemporaryDirectory()
+    _TABLE_DIRECTORIES.append(directory)
+    table = TransitionTable(
+        Size(BOARD_SIZE.width * size_multiplier, BOARD_SIZE.height * size_multiplier),
+        PREY_CAPACITY * (size_multiplier ** 2),
+        path=os.path.join(directory.name, 'table.npz'),
+    )
+    return {'table': table}
+
+
+def _board(engine: str, size_multiplier: int, warmup_steps: int = WARMUP_STEPS):
+    board = ENGINES[engine](
+        size=Size(BOARD_SIZE.width * size_multiplier, BOARD_SIZE.height * size_multiplier),
+        prey_capacity=PREY_CAPACITY * (size_multiplier ** 2),
+        rng=np.random.default_rng(SEED),
+        **_table_kwargs(engine, size_multiplier),
+    )
+    [board.step() for _ in range(warmup_steps)]
+    return board
+
+
+@benchmark('striper_pogy.board_step', number=10, engine=list(ENGINES.keys()), size_multiplier=[1, 2, 4, 8])
+def board_step(engine: str, size_multiplier: int):
+    return _board(engine, size_multiplier).step
+
+
+@benchmark('striper_pogy.feed', engine=list(FISH_ENGINES.keys()), num_prey=[100, 1_000, 10_000])
+def feed(engine: str, num_prey: int):
+    """ The predator-prey contact loop, with one predator for every ten prey on a board with room for them. """
+    board = _board(engine, size_multiplier=max(1, int(np.sqrt(num_prey / PREY_CAPACITY))), warmup_steps=0)
+    if engine == 'objects':
+        board.prey = Prey.spawn(num_prey, board.size, board.rng)
+        board.predators = Predator.spawn(num_prey // 10, board.size, board.rng)
+    else:
+        board.prey.spawn(num_prey, board.size, board.rng)
+        board.predators.spawn(num_prey // 10, board.size, board.rng)
+    return board._feed
+
+
+@benchmark('striper_pogy.board_draw', number=5, engine=list(FISH_ENGINES.keys()), resolution=[2 ** 10, 2 ** 12])
+def board_draw(engine: str, resolution: int):
+    board = _board(engine, size_multiplier=2)
+    return lambda: board.draw(resolution)
+
+
+@benchmark('striper_pogy.simulate_once', repeat=3, engine=list(ENGINES.keys()), size_multiplier=[1, 2])
+def simulate_once_(engine: str, size_multiplier: int):
+    rng = np.random.default_rng(SEED)
+    kwargs = _table_kwargs(engine, size_multiplier)
+    return lambda: simulate_once(size_multiplier, time_steps=100, engine=engine, verbose=False, rng=rng, **kwargs)
@@ -0,0 +1,123 @@
+import datetime
+import itertools
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# seed of every random number generator used by the benchmarks, so that every run times the same work.
+SEED: int = 0
+
+
+class Benchmark:
+    """ This class represents one benchmark, timed once for every combination of its parameters.
+
+    The setup function is called with one combination of the parameters and returns the function to time.
+    Setup is called again before every repeat, so benchmarks that change state always start from the same state,
+    and the time spent in setup is never counted.
+    """
+    def __init__(
+            self,
+            name: str,
+            setup: Callable[..., Callable[[], Any]],
+            params: Dict[str, List[Any]],
+            number: int,
+            repeat: int,
+    ):
+        """
+        :param name: dotted name of the benchmark, starting with the project it measures.
+        :param setup: function that takes one combination of the parameters and returns the function to time.
+        :param params: the values of each parameter.
+        :param number: number of calls of the timed function in each repeat.
+        :param repeat: number of times to time the function, each after a fresh setup.
+        """
+        if number < 1 or repeat < 1:
+            raise ValueError(f'number and repeat must be at least 1. Got number={number}, repeat={repeat}.')
+        self.name: str = name
+        self.setup: Callable[..., Callable[[], Any]] = setup
+        self.params: Dict[str, List[Any]] = params
+        self.number: int = number
+        self.repeat: int = repeat
+
+    def cases(self) -> List[Dict[str, Any]]:
+        """ Every combination of the parameters. """
+        names = list(self.params.keys())
+        return [dict(zip(names, values)) for values in itertools.product(*self.params.values())]
+
+    def run(self, repeat: Optional[int] = None) -> List[Dict[str, Any]]:
+        """ Times every case of the benchmark.
+
+        :param repeat: overrides the number of repeats of the benchmark.
+        :return: one result per case, with the time per call of every repeat and their summary statistics in seconds.
+        """
+        results: List[Dict[str, Any]] = list()
+        for case in self.cases():
+            times: List[float] = list()
+            for _ in range(repeat or self.repeat):
+                function = self.setup(**case)
+                start = time.perf_counter()
+                for _ in range(self.number):
+                    function()
+                times.append((time.perf_counter() - start) / self.number)
+            results.append({
+                'name': self.name,
+                'params': case,
+                'number': self.number,
+                'repeat': len(times),
+                'min': min(times),
+                'median': statistics.median(times),
+                'mean': statistics.mean(times),
+                'stdev': statistics.stdev(times) if len(times) > 1 else 0.,
+                'times': times,
+            })
+        return results
+
+
+# every registered benchmark, in the order in which they were registered.
+BENCHMARKS: List[Benchmark] = list()
+
+
+def benchmark(name: str, *, number: int = 1, repeat: int = 5, **params: List[Any]):
+    """ Registers the decorated setup function as a benchmark. See Benchmark.
+
+    e.g.
+        @benchmark('striper_pogy.board_step', size_multiplier=[1, 2, 4])
+        def board_step(size_multiplier):
+            board = ...
+            return board.step
+    """
+    def register(setup: Callable[..., Callable[[], Any]]) -> Callable[..., Callable[[], Any]]:
+        BENCHMARKS.append(Benchmark(name, setup, params, number, repeat))
+        return setup
+    return register
+
+
+def _version(module_name: str) -> Optional[str]:
+    module = sys.modules.get(module_name)
+    return getattr(module, '__version__', None)
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        output = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT_DIR, capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return output.stdout.strip() or None
+
+
+def environment() -> Dict[str, Any]:
+    """ Describes the machine, the libraries and the commit that the benchmarks ran on, for comparing runs. """
+    return {
+        'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+        'versions': {name: _version(name) for name in ['numpy', 'scipy', 'matplotlib', 'PIL']},
+    }
@@ -0,0 +1,109 @@
+import argparse
+import importlib
+import json
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from harness import BENCHMARKS, environment
+
+RESULTS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), 'results'))
+
+# modules that register benchmarks, one per project.
+SUITES: List[str] = [
+    'bench_striper_pogy',
+    'bench_difference_equations',
+    'bench_food_web',
+]
+
+
+def load_suites() -> Dict[str, str]:
+    """ Imports every suite, which registers its benchmarks.
+
+    :return: dictionary from the name of each suite that could not be imported to the reason why.
+    """
+    skipped: Dict[str, str] = dict()
+    for suite in SUITES:
+        try:
+            importlib.import_module(suite)
+        except ImportError as e:
+            skipped[suite] = str(e)
+    return skipped
+
+
+def _key(result: Dict[str, Any]) -> Tuple[str, str]:
+    return result['name'], json.dumps(result['params'], sort_keys=True)
+
+
+def compare(baseline: Dict[str, Any], results: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """ Compares the median times of the benchmarks that appear in both runs.
+
+    :param baseline: the output of an earlier run.
+    :param results: the output of a later run.
+    :return: one entry per benchmark case, with the ratio of the later median time to the earlier one.
+    """
+    before = {_key(r): r for r in baseline['results']}
+    return [
+        {
+            'name': r['name'],
+            'params': r['params'],
+            'baseline': before[_key(r)]['median'],
+            'median': r['median'],
+            'ratio': r['median'] / before[_key(r)]['median'],
+        }
+        for r in results['results']
+        if _key(r) in before
+    ]
+
+
+def main(
+        pattern: str = '',
+        repeat: Optional[int] = None,
+        output: Optional[str] = None,
+        baseline: Optional[str] = None,
+) -> Dict[str, Any]:
+    """ Runs the benchmarks and writes their results as JSON.
+
+    :param pattern: only run the benchmarks whose name contains this string.
+    :param repeat: overrides the number of repeats of every benchmark.
+    :param output: file path of the JSON results. Defaults to a file named after the time under benchmarks/results.
+    :param baseline: file path of the JSON results of an earlier run to compare against.
+    :return: the results that were written.
+    """
+    skipped = load_suites()
+    for suite, reason in skipped.items():
+        print(f'skipping {suite}: {reason}')
+
+    results: List[Dict[str, Any]] = list()
+    for bench in BENCHMARKS:
+        if pattern not in bench.name:
+            continue
+        for result in bench.run(repeat):
+            print(f'{result["name"]:<40} {json.dumps(result["params"]):<50} median {result["median"] * 1e3:10.3f} ms')
+            results.append(result)
+
+    report = {'environment': environment(), 'skipped': skipped, 'results': results}
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, report['environment']['timestamp'].replace(':', '-') + '.json')
+    with open(output, 'w') as fp:
+        json.dump(report, fp, indent=2)
+    print(f'results written to {output}')
+
+    if baseline is not None:
+        with open(baseline) as fp:
+            report['comparison'] = compare(json.load(fp), report)
+        for entry in report['comparison']:
+            print(f'{entry["name"]:<40} {json.dumps(entry["params"]):<50} {entry["ratio"]:6.2f}x baseline')
+        with open(output, 'w') as fp:
+            json.dump(report, fp, indent=2)
+    return report
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Runs the benchmarks and writes their results as JSON.')
+    parser.add_argument('-k', '--pattern', default='', help='only run benchmarks whose name contains this string.')
+    parser.add_argument('-r', '--repeat', type=int, default=None, help='override the number of repeats.')
+    parser.add_argument('-o', '--output', default=None, help='file path of the JSON results.')
+    parser.add_argument('-b', '--baseline', default=None, help='JSON results of an earlier run to compare against.')
+    args = parser.parse_args()
+    main(args.pattern, args.repeat, args.output, args.baseline)
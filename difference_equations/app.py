@@ -1,56 +1,77 @@
-from typing import List, Tuple
+import io
+import os
+import sys
+from typing import Dict, List, Optional, Tuple
 
 import numpy as np
 import streamlit as st
-from matplotlib import pyplot as plt
+from matplotlib.figure import Figure
+
+from cache import PLOTS, TRAJECTORIES
+from equilibria import analyze, bifurcation, describe, plot_bifurcation
+from model import Constants, get_isoclines, run_grid
+
+# draw_trajectories is shared with striper_pogy. See shared/README.md.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'shared'))
+from trajectories import draw_trajectories  # noqa: E402
+
+# the (min, max, step) of the slider of each constant in the apps, and of the step size of the difference equations.
+SLIDERS: Dict[str, Tuple[float, float, float]] = {
+    'reproduction_rate': (0., 1., 0.05),
+    'prey_capacity': (50, 200, 5),
+    'consumption_rate': (0.01, 0.2, 0.01),
+    'efficiency': (0.05, 0.4, 0.01),
+    'death_rate': (0.01, 0.2, 0.01),
+    'delta_t': (0.1, 1., 0.05),
+}
+
+
+def to_png(fig: Figure) -> bytes:
+    """ Renders a figure to PNG bytes. Figures are drawn without pyplot, so that sessions in threads can draw at once.
+    """
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png')
+    return buffer.getvalue()
 
 
 def draw_phase_plot(
         populations: List[np.array],
         isoclines: Tuple[np.array, np.array, np.array],
-):
-    plt.clf()
-    fig = plt.figure(figsize=(8, 5), dpi=128)
-    fig.add_subplot(111)
-
-    for run in populations:
-        x, y = run[0], run[1]
-        # flatten the image
-        plt.quiver(
-            x[:-1],  # x-coordinates of pixels
-            y[:-1],  # y-coordinates of pixels
-            x[1:] - x[:-1],  # flow-x
-            y[1:] - y[:-1],  # flow-y
-            scale_units='xy',
-            angles='xy',
-            scale=1,
-            width=0.0025,
-        )
-
-    plt.plot(isoclines[0], isoclines[1], label='prey-cline', color='blue', lw=0.75)
-    plt.plot(isoclines[0], isoclines[2], label='predator-cline', color='red', lw=0.75)
-
-    plt.xlabel('Prey Population')
-    plt.ylabel('Predator Population')
-    plt.title('Predator-Prey Population Phase Plot with Isoclines')
-    plt.legend()
-    st.pyplot(fig)
-    return
-
-
-def get_isoclines(
-        limits: Tuple[float, float],
-        reproduction_rate: float,
-        prey_capacity: float,
-        consumption_rate: float,
-        efficiency: float,
-        death_rate: float,
-) -> Tuple[np.array, np.array, np.array]:
-    # calculate isoclines
-    xs = np.linspace(start=limits[0], stop=limits[1], num=100)
-    pogy_cline = reproduction_rate * (1 - xs / prey_capacity) / consumption_rate
-    striper_cline = (efficiency * consumption_rate / death_rate) * xs
-    return xs, pogy_cline, striper_cline
+) -> bytes:
+    """ Draws the phase plot of every run with the isoclines, and returns it as PNG bytes.
+    The runs are drawn by draw_trajectories, so the time it takes is bounded however many and long they are.
+    """
+    fig = Figure(figsize=(8, 5), dpi=128)
+    ax = fig.add_subplot(111)
+
+    # the isoclines go first, so that the axes are already scaled to them when the trajectories are simplified.
+    ax.plot(isoclines[0], isoclines[1], label='prey-cline', color='blue', lw=0.75)
+    ax.plot(isoclines[0], isoclines[2], label='predator-cline', color='red', lw=0.75)
+    draw_trajectories(ax, populations)
+
+    ax.set_xlabel('Prey Population')
+    ax.set_ylabel('Predator Population')
+    ax.set_title('Predator-Prey Population Phase Plot with Isoclines')
+    ax.legend()
+    return to_png(fig)
+
+
+def draw_bifurcation_diagram(constants: Constants, parameter: str, delta_t: Optional[float] = None) -> bytes:
+    """ Draws the fixed points of the model over the whole range of the slider of a parameter, as PNG bytes.
+    The fixed points are found in closed form, over every value at once, so nothing is run.
+
+    :param constants: constants of the model.
+    :param parameter: a field of Constants, or 'delta_t' for the step size of the difference equations.
+    :param delta_t: step size of the difference equations. None for the differential equations.
+    """
+    low, high, _ = SLIDERS[parameter]
+    values = np.linspace(low, high, 500)
+    current = delta_t if parameter == 'delta_t' else getattr(constants, parameter)
+
+    fig = Figure(figsize=(8, 6), dpi=128)
+    axes = fig.subplots(2, 1, sharex=True)
+    plot_bifurcation(axes, parameter, values, bifurcation(constants, parameter, values, delta_t), current)
+    return to_png(fig)
 
 
 def main():
@@ -69,48 +90,22 @@ def main():
     grid_size = st.slider('Starting Grid', 0, 20, 0, 2)
     grid_size = grid_size // 2
 
-    starting_prey, starting_predators = 3, 1
-    min_prey, min_predators = 3, 1
-
-    def prey_delta(pop_prey, pop_predators):
-        delta_pop = pop_prey * (reproduction_rate * (1 - pop_prey / prey_capacity) - consumption_rate * pop_predators)
-        return max(min(delta_pop * delta_t, prey_capacity - pop_prey), min_prey - pop_prey)
-
-    def predators_delta(pop_prey, pop_predators):
-        delta_pop = pop_predators * (consumption_rate * efficiency * pop_prey - death_rate * pop_predators)
-        return max(delta_pop * delta_t, min_predators - pop_predators)
-
-    def run_simulation(run: np.array):
-        for i in range(1, num_steps + 1):
-            prev_prey, prev_predators = run[0, i - 1], run[1, i - 1]
-            next_prey = prev_prey + prey_delta(prev_prey, prev_predators)
-            next_predators = prev_predators + predators_delta(prev_prey, prev_predators)
-            run[:, i] = (next_prey, next_predators)
-        return run
-
-    num_steps = int(time_steps / delta_t)
-    first_run = np.zeros((2, num_steps + 1), dtype=float)
-    first_run[:, 0] = (starting_prey, starting_predators)
-    first_run = run_simulation(first_run)
-    populations: List[np.array] = [first_run]
-
-    if grid_size > 0:
-        max_prey, max_predators = max(first_run[0]), max(first_run[1])
-        prey_step, predators_step = (max_prey - min_prey) / grid_size, (max_predators - min_predators) / grid_size
-        for x in range(1, 1 + grid_size):
-            for y in range(1, 1 + grid_size):
-                starting_prey = min_prey + prey_step * (x - 0.5 * (y % 2))
-                starting_predators = min_predators + predators_step * (y + 0.5 * (x % 2))
-                new_run = np.zeros_like(first_run)
-                new_run[:, 0] = (starting_prey, starting_predators)
-                new_run = run_simulation(new_run)
-                populations.append(new_run)
-
-    constants = [reproduction_rate, prey_capacity, consumption_rate, efficiency, death_rate]
-    isoclines = get_isoclines((min(first_run[0]), max(first_run[0])), *constants)
-    st.write(f'The Equilibrium populations are: prey: {first_run[0][-1]:.1f}, predators: {first_run[1][-1]:.1f}')
-
-    draw_phase_plot(populations, isoclines)
+    constants = Constants(reproduction_rate, prey_capacity, consumption_rate, efficiency, death_rate)
+    populations = run_grid(constants, time_steps, delta_t, grid_size, cache=TRAJECTORIES)
+    first_run = populations[0]
+    st.write(f'The Equilibria are: {describe(analyze(constants, delta_t))}')
+
+    def phase_plot() -> bytes:
+        isoclines = get_isoclines((min(first_run[0]), max(first_run[0])), *constants)
+        return draw_phase_plot(populations, isoclines)
+
+    st.image(PLOTS.get_or_compute(('difference', 'phase', constants, time_steps, delta_t, grid_size), phase_plot))
+
+    parameter = st.selectbox('Bifurcation Parameter', list(Constants._fields) + ['delta_t'])
+    st.image(PLOTS.get_or_compute(
+        ('difference', 'bifurcation', constants, delta_t, parameter),
+        lambda: draw_bifurcation_diagram(constants, parameter, delta_t),
+    ))
     return
 
 
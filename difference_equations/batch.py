@@ -0,0 +1,203 @@
+import argparse
+import csv
+import json
+import os
+from typing import Any, Dict, List
+
+import numpy as np
+
+from equilibria import CLASSES, FIXED_POINTS, analyze
+from model import STARTING_PREDATORS, STARTING_PREY, TIMES, Constants, run_batch, run_grid, solve_batch, solve_grid
+
+# the models that can be run, and the defaults of their constants, which are those of the sliders in the apps.
+MODELS: List[str] = ['difference', 'ode']
+DEFAULT_CONSTANTS: Constants = Constants(
+    reproduction_rate=0.5,
+    prey_capacity=100,
+    consumption_rate=0.05,
+    efficiency=0.15,
+    death_rate=0.05,
+)
+
+
+def ode_times(max_time: float, time_step: float) -> np.array:
+    """ Times at which the differential equations report the populations, as TIMES does for the app. """
+    if not (max_time > 0) or not (time_step > 0):
+        raise ValueError(f'max_time and time_step must be positive numbers. Got {max_time} and {time_step} instead.')
+    return np.arange(start=0, stop=max_time, step=time_step)
+
+
+def read_constants(path: str) -> Constants:
+    """ Reads a batch of constants from a CSV or JSON file, as a Constants of arrays.
+
+    A CSV file has a header with the fields of Constants, and one row per point. A JSON file holds either a list of
+    objects with those fields, or one object with a list of values per field. Missing fields take the defaults of
+    DEFAULT_CONSTANTS.
+    """
+    if path.endswith('.json'):
+        with open(path) as fp:
+            data = json.load(fp)
+        rows = data if isinstance(data, list) else [dict(zip(data, values)) for values in zip(*data.values())]
+    else:
+        with open(path, newline='') as fp:
+            rows = list(csv.DictReader(fp))
+    if len(rows) == 0:
+        raise ValueError(f'{path} holds no constants.')
+
+    unknown = set().union(*rows) - set(Constants._fields)
+    if unknown:
+        raise ValueError(f'unknown constants {sorted(unknown)} in {path}. Must be among {list(Constants._fields)}.')
+    return Constants(*(
+        np.array([float(row.get(field, default)) for row in rows])
+        for field, default in zip(Constants._fields, DEFAULT_CONSTANTS)
+    ))
+
+
+def write_settings(path: str, settings: Dict[str, Any]):
+    """ Writes the settings of a run next to its array of populations, as <name>.json. """
+    with open(f'{os.path.splitext(path)[0]}.json', 'w') as fp:
+        json.dump(settings, fp, indent=2)
+    return
+
+
+def grid(
+        path: str,
+        model: str,
+        constants: Constants,
+        grid_size: int,
+        *,  # any arguments after '*' must be passed by name.
+        time_steps: float = 100,
+        delta_t: float = 0.25,
+        time: np.array = TIMES,
+):
+    """ Runs one model from its first start and its starting grid, as the apps do, and saves every run to disk.
+
+    :param path: .npy file of the runs, of shape (1 + grid_size ** 2, 2, steps), starting with the first run.
+    :param model: 'difference' or 'ode'.
+    :param constants: constants of the model.
+    :param grid_size: number of starting points along each side of the grid.
+    :param time_steps: length of time for which to run the difference equations.
+    :param delta_t: size of each step of the difference equations.
+    :param time: times at which the differential equations report the populations.
+    """
+    if model == 'difference':
+        populations = run_grid(constants, time_steps, delta_t, grid_size)
+        settings = {'time_steps': time_steps, 'delta_t': delta_t}
+    else:
+        populations = solve_grid(constants, time, grid_size)
+        settings = {'time': time.tolist()}
+    np.save(path, np.stack(populations))
+    write_settings(path, {'model': model, 'constants': constants._asdict(), 'grid_size': grid_size, **settings})
+    return
+
+
+def batch(
+        path: str,
+        model: str,
+        constants: Constants,
+        *,  # any arguments after '*' must be passed by name.
+        time_steps: float = 100,
+        delta_t: float = 0.25,
+        time: np.array = TIMES,
+        chunk: int = 1024,
+):
+    """ Runs one model from (STARTING_PREY, STARTING_PREDATORS) for every point of a batch of constants.
+
+    All the points of a chunk are run together, with arrays of constants in place of single constants, and are
+    written straight into a memory-mapped .npy file, so a batch never needs to fit in memory.
+
+    :param path: .npy file of the runs, of shape (num_points, 2, steps), in the order of the constants.
+    :param model: 'difference' or 'ode'.
+    :param constants: Constants of arrays, each with the value of that constant at every point.
+    :param time_steps: length of time for which to run the difference equations.
+    :param delta_t: size of each step of the difference equations.
+    :param time: times at which the differential equations report the populations.
+    :param chunk: number of points run together.
+    """
+    if not (chunk >= 1):
+        raise ValueError(f'chunk must be a positive number of points. Got {chunk} instead.')
+    num_points = len(constants[0])
+    num_steps = int(time_steps / delta_t)
+    length = num_steps + 1 if model == 'difference' else len(time)
+    out = np.lib.format.open_memmap(path, mode='w+', dtype=float, shape=(num_points, 2, length))
+    for start in range(0, num_points, chunk):
+        stop = min(start + chunk, num_points)
+        points = Constants(*(values[start:stop] for values in constants))
+        starts = np.tile((STARTING_PREY, STARTING_PREDATORS), (stop - start, 1))
+        if model == 'difference':
+            out[start:stop] = run_batch(starts, points, delta_t, num_steps)
+        else:
+            out[start:stop] = solve_batch(starts, time, points)
+    out.flush()
+    del out
+
+    if model == 'difference':
+        settings = {'time_steps': time_steps, 'delta_t': delta_t}
+    else:
+        settings = {'time': time.tolist()}
+    write_settings(path, {'model': model, 'constants': {k: v.tolist() for k, v in constants._asdict().items()},
+                          **settings})
+    return
+
+
+def stability(path: str, model: str, constants: Constants, *, delta_t: float = 0.25):
+    """ Finds the fixed points of one model, and their stability, for every point of a batch of constants at once.
+
+    Nothing is run, so this answers e.g. which constants give a stable coexistence point in one vectorized pass.
+
+    :param path: .npz file of the fields of Equilibria, each with a first axis of len(FIXED_POINTS) and a second axis
+                 of the points, in the order of the constants. The stability is an index of CLASSES, or -1 where the
+                 fixed point does not exist.
+    :param model: 'difference' or 'ode'.
+    :param constants: Constants of arrays, each with the value of that constant at every point.
+    :param delta_t: size of each step of the difference equations.
+    """
+    np.savez(path, **analyze(constants, delta_t if model == 'difference' else None)._asdict())
+    write_settings(path, {
+        'model': model,
+        'constants': {k: v.tolist() for k, v in constants._asdict().items()},
+        **({'delta_t': delta_t} if model == 'difference' else {}),
+        'fixed_points': FIXED_POINTS,
+        'classes': CLASSES,
+    })
+    return
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Runs the predator-prey models headlessly, and saves the runs.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    grid_parser = subparsers.add_parser('grid', help='runs one set of constants from a grid of starts, like the apps.')
+    grid_parser.add_argument('--grid-size', type=int, default=5, help='number of starts along each side of the grid.')
+    for field, default in zip(Constants._fields, DEFAULT_CONSTANTS):
+        grid_parser.add_argument(f'--{field.replace("_", "-")}', type=float, default=default, help=f'{field}.')
+
+    batch_parser = subparsers.add_parser('batch', help='runs one start for every set of constants in a file.')
+    batch_parser.add_argument('constants', help='CSV or JSON file of constants. See read_constants.')
+    batch_parser.add_argument('--chunk', type=int, default=1024, help='number of points run together.')
+
+    stability_parser = subparsers.add_parser('stability', help='finds the fixed points for every set of constants.')
+    stability_parser.add_argument('constants', help='CSV or JSON file of constants. See read_constants.')
+    stability_parser.add_argument('-o', '--output', required=True, help='.npz file of the fixed points.')
+    stability_parser.add_argument('--model', choices=MODELS, default='difference', help='model to analyze.')
+    stability_parser.add_argument('--delta-t', type=float, default=0.25, help='step size of the difference equations.')
+
+    for subparser in (grid_parser, batch_parser):
+        subparser.add_argument('-o', '--output', required=True, help='.npy file of the runs.')
+        subparser.add_argument('--model', choices=MODELS, default='difference', help='model to run.')
+        subparser.add_argument('--time-steps', type=float, default=100, help='time of the difference equations.')
+        subparser.add_argument('--delta-t', type=float, default=0.25, help='step size of the difference equations.')
+        subparser.add_argument('--max-time', type=float, default=100, help='time of the differential equations.')
+        subparser.add_argument('--time-step', type=float, default=0.25,
+                               help='time between the reports of the differential equations.')
+    args = parser.parse_args()
+
+    if args.command == 'stability':
+        stability(args.output, args.model, read_constants(args.constants), delta_t=args.delta_t)
+    elif args.command == 'grid':
+        grid_constants = Constants(*(getattr(args, field) for field in Constants._fields))
+        grid(args.output, args.model, grid_constants, args.grid_size, time_steps=args.time_steps,
+             delta_t=args.delta_t, time=ode_times(args.max_time, args.time_step))
+    else:
+        batch(args.output, args.model, read_constants(args.constants), time_steps=args.time_steps,
+              delta_t=args.delta_t, time=ode_times(args.max_time, args.time_step), chunk=args.chunk)
@@ -0,0 +1,121 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# marks a key that is not in a cache, since None may be a cached value.
+_MISSING = object()
+
+
+class LRUCache:
+    """ This class keeps the most recently used results, up to a total weight, for every session of an app.
+
+    Streamlit reruns the script of an app on every interaction, but only imports other modules once, so the caches in
+    this module are shared by every rerun and every session. Entries are weighed (e.g. in bytes), and the least
+    recently used ones are evicted once the total weight is over the capacity. Sessions run in threads, so every
+    access holds a lock. Values are computed outside of it, so a slow computation never blocks other sessions.
+    """
+    def __init__(self, capacity: int, weigh: Callable[[Any], int] = lambda _: 1):
+        """
+        :param capacity: largest total weight of the entries.
+        :param weigh: the weight of a value. Defaults to 1, so the capacity is a number of entries.
+        """
+        if not (capacity > 0):
+            raise ValueError(f'capacity must be a positive number. Got {capacity} instead.')
+        self.capacity: int = capacity
+        self.weigh: Callable[[Any], int] = weigh
+        self.weight: int = 0
+        self.hits: int = 0
+        self.misses: int = 0
+        self._entries: 'OrderedDict[Hashable, Any]' = OrderedDict()
+        self._lock: threading.Lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """ The value of the key, which becomes the most recently used, or the default if it is not cached. """
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def put(self, key: Hashable, value: Any):
+        """ Caches the value under the key, evicting the least recently used entries if it no longer fits. """
+        weight = self.weigh(value)
+        with self._lock:
+            if key in self._entries:
+                self.weight -= self.weigh(self._entries.pop(key))
+            self._entries[key] = value
+            self.weight += weight
+            # the newest entry is always kept, even if it is heavier than the capacity on its own.
+            while (self.weight > self.capacity) and (len(self._entries) > 1):
+                _, evicted = self._entries.popitem(last=False)
+                self.weight -= self.weigh(evicted)
+        return
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """ The value of the key, computed and cached first if it is not cached. """
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'entries': len(self._entries), 'weight': self.weight, 'hits': self.hits, 'misses': self.misses}
+
+
+def frozen(array: np.array) -> np.array:
+    """ Makes an array read-only before it is cached, since every session that reads it gets the same object. """
+    array.setflags(write=False)
+    return array
+
+
+def cached_runs(
+        cache: Optional[LRUCache],
+        model: Hashable,
+        starts: List[Tuple[float, float]],
+        compute: Callable[[np.array], Iterable[np.array]],
+) -> List[np.array]:
+    """ The runs of a model from each of the starting populations, only computing those that are not cached.
+
+    A run is only reused for a start that matches a cached one, i.e. the first run, which does not depend on the grid
+    at all, and every start of a grid that was shown before with the same constants. The staggered grids of different
+    sizes share few starts, so growing a grid mostly computes new runs. Starts are rounded to 9 decimals in the keys,
+    which only absorbs the rounding errors of computing the same start twice.
+
+    :param cache: the cache of runs. None computes every run.
+    :param model: everything about the model that decides its runs, besides the start, e.g. its constants.
+    :param starts: the starting prey and predator populations of each run.
+    :param compute: computes the runs from an array of shape (num_runs, 2) of starts, all together.
+    :return: the run from each start.
+    """
+    if cache is None:
+        return list(compute(np.array(starts, dtype=float).reshape(-1, 2)))
+
+    keys = [(model, round(float(prey), 9), round(float(predators), 9)) for prey, predators in starts]
+    runs = [cache.get(key) for key in keys]
+    missing = [i for i, run in enumerate(runs) if run is None]
+    if missing:
+        computed = compute(np.array([starts[i] for i in missing], dtype=float).reshape(-1, 2))
+        for i, run in zip(missing, computed):
+            runs[i] = frozen(np.array(run))  # a copy, so a cached run never holds on to the rest of a batch.
+            cache.put(keys[i], runs[i])
+    return runs
+
+
+# trajectories of the models, keyed by the model, its constants, its time steps and the starting populations.
+TRAJECTORIES: LRUCache = LRUCache(capacity=2 ** 27, weigh=lambda array: array.nbytes)
+
+# rendered plots as PNG bytes, keyed by the kind of plot and everything that decides it.
+PLOTS: LRUCache = LRUCache(capacity=2 ** 26, weigh=len)
@@ -0,0 +1,234 @@
+from collections import namedtuple
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+from matplotlib.axes import Axes
+
+from model import MIN_PREDATORS, MIN_PREY, Constants
+
+# the fixed points of the models, one per smooth piece of the models (see piece_differential), by which populations
+# sit on their floors. PIECES holds whether each population is free to follow its equation at the fixed point.
+FIXED_POINTS: List[str] = ['coexistence', 'prey floor', 'predator floor', 'both floors']
+PIECES: List[Tuple[bool, bool]] = [(True, True), (False, True), (True, False), (False, False)]
+
+# the stability of a fixed point, encoded by its index in this list. -1 marks a fixed point that does not exist.
+CLASSES: List[str] = [
+    'stable node', 'stable focus', 'unstable node', 'unstable focus', 'saddle', 'center', 'degenerate',
+]
+STABLE: List[int] = [CLASSES.index('stable node'), CLASSES.index('stable focus')]
+MISSING: int = -1
+
+# real parts (or, for the difference equations, moduli minus one) of eigenvalues closer than this to 0 count as 0.
+TOLERANCE: float = 1e-9
+
+# every fixed point of a model, with arrays of shape (len(FIXED_POINTS), *shape of the constants), and the eigenvalues
+# of its Jacobian, with an extra axis of length 2. The populations of the fixed points that do not exist are NaN.
+Equilibria = namedtuple('Equilibria', 'prey predators valid eigenvalues stability')
+
+
+def fixed_points(constants: Constants) -> Tuple[np.array, np.array, np.array]:
+    """ Fixed points of the models on each of their smooth pieces, in closed form.
+
+    Both models share their fixed points, since a step of the difference equations only vanishes where the rates of
+    the differential equations do. Where a population is free, its equation vanishes on its isocline (see
+    get_isoclines). Where it is on its floor, it stays there if its equation would pull it lower. A fixed point exists
+    if it is above both floors and its floored populations are held there.
+
+    :param constants: constants of the model, which may be arrays that broadcast together.
+    :return: the prey and predators of each fixed point, and whether it exists, in the order of FIXED_POINTS.
+    """
+    reproduction_rate, prey_capacity, consumption_rate, efficiency, death_rate = constants
+    slope = efficiency * consumption_rate / death_rate  # of the predator isocline.
+
+    def prey_rate(prey, predators):
+        return prey * (reproduction_rate * (1 - prey / prey_capacity) - consumption_rate * predators)
+
+    def predators_rate(prey, predators):
+        return predators * (efficiency * consumption_rate * prey - death_rate * predators)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        coexistence_prey = reproduction_rate / (reproduction_rate / prey_capacity + consumption_rate * slope)
+        floor_prey = prey_capacity * (1 - consumption_rate / reproduction_rate)
+    prey = [coexistence_prey, MIN_PREY, floor_prey, MIN_PREY]
+    predators = [slope * coexistence_prey, slope * MIN_PREY, MIN_PREDATORS, MIN_PREDATORS]
+    valid = [
+        (coexistence_prey >= MIN_PREY) & (slope * coexistence_prey >= MIN_PREDATORS),
+        (slope * MIN_PREY >= MIN_PREDATORS) & (prey_rate(MIN_PREY, slope * MIN_PREY) <= 0),
+        (floor_prey >= MIN_PREY) & (predators_rate(floor_prey, MIN_PREDATORS) <= 0),
+        (prey_rate(MIN_PREY, MIN_PREDATORS) <= 0) & (predators_rate(MIN_PREY, MIN_PREDATORS) <= 0),
+    ]
+    shape = np.broadcast(*constants).shape
+    return tuple(np.stack([np.broadcast_to(value, shape) for value in values]) for values in (prey, predators, valid))
+
+
+def jacobian(
+        prey: np.array,
+        predators: np.array,
+        constants: Constants,
+        free: Tuple[bool, bool],
+        delta_t: Optional[np.array] = None,
+) -> np.array:
+    """ Jacobians of one smooth piece of a model at arrays of populations, as piece_jacobian but for many at once.
+
+    :param prey: prey populations.
+    :param predators: predator populations.
+    :param constants: constants of the model, which may be arrays that broadcast with the populations.
+    :param free: whether each population follows its equation, rather than its floor.
+    :param delta_t: the step size of the difference equations, for the Jacobian of one of their steps. None for the
+                    differential equations.
+    :return: array of shape (*shape of the populations and constants, 2, 2).
+    """
+    reproduction_rate, prey_capacity, consumption_rate, efficiency, death_rate = constants
+    rows = [
+        [
+            reproduction_rate * (1 - 2 * prey / prey_capacity) - consumption_rate * predators,
+            -consumption_rate * prey,
+        ] if free[0] else [-1., 0.],
+        [
+            efficiency * consumption_rate * predators,
+            efficiency * consumption_rate * prey - 2 * death_rate * predators,
+        ] if free[1] else [0., -1.],
+    ]
+    if delta_t is not None:
+        # a step moves a free population by delta_t times its rate, and puts a floored one right on its floor.
+        rows = [
+            [(i == j) + delta_t * entry for j, entry in enumerate(row)] if is_free else [0., 0.]
+            for i, (row, is_free) in enumerate(zip(rows, free))
+        ]
+    shape = np.broadcast(prey, predators, *constants, *([] if delta_t is None else [delta_t])).shape
+    return np.stack([np.stack([np.broadcast_to(entry, shape) for entry in row], axis=-1) for row in rows], axis=-2)
+
+
+def classify(eigenvalues: np.array, discrete: bool = False) -> np.array:
+    """ Classifies fixed points by the eigenvalues of their Jacobians, as indices of CLASSES.
+
+    :param eigenvalues: array of shape (..., 2).
+    :param discrete: whether the Jacobians are of a step of the difference equations, which are stable where the
+                     eigenvalues are inside the unit circle, rather than of the differential equations, which are
+                     stable where they have negative real parts.
+    :return: array of shape (...).
+    """
+    growth = np.abs(eigenvalues) - 1 if discrete else eigenvalues.real
+    rotating = np.any(np.abs(eigenvalues.imag) > TOLERANCE, axis=-1)
+    low, high = growth.min(axis=-1), growth.max(axis=-1)
+    return np.select(
+        [high < -TOLERANCE, low > TOLERANCE, (low < -TOLERANCE) & (high > TOLERANCE), rotating],
+        [
+            np.where(rotating, CLASSES.index('stable focus'), CLASSES.index('stable node')),
+            np.where(rotating, CLASSES.index('unstable focus'), CLASSES.index('unstable node')),
+            CLASSES.index('saddle'),
+            CLASSES.index('center'),
+        ],
+        default=CLASSES.index('degenerate'),
+    )
+
+
+def analyze(constants: Constants, delta_t: Optional[np.array] = None) -> Equilibria:
+    """ Finds every fixed point of a model, and its stability, for whole grids of constants at once.
+
+    For example, the constants at which the differential equations have a stable coexistence point are
+        reproduction_rate, death_rate = np.meshgrid(np.linspace(0, 1, 101), np.linspace(0.01, 0.2, 20))
+        equilibria = analyze(Constants(reproduction_rate, 100, 0.05, 0.15, death_rate))
+        stable = is_stable(equilibria.stability[FIXED_POINTS.index('coexistence')])
+
+    Stability is local: a large swing can still carry the populations onto their floors, and the floors can hold a
+    cycle around a stable fixed point, e.g. for the difference equations with a large step size. Those runs keep
+    oscillating, whatever the fixed point.
+
+    :param constants: constants of the model, which may be arrays that broadcast together.
+    :param delta_t: the step size of the difference equations, which may also be an array. None for the differential
+                    equations. Their fixed points are the same, but their stability is not.
+    :return: the fixed points, in the order of FIXED_POINTS.
+    """
+    prey, predators, valid = fixed_points(constants)
+    shape = np.broadcast(*constants, *([] if delta_t is None else [delta_t])).shape
+    # the step size may add axes in front of those of the constants, so those of the fixed points are lined up first.
+    prey, predators, valid = (
+        np.broadcast_to(values.reshape((len(PIECES),) + (1,) * (len(shape) + 1 - values.ndim) + values.shape[1:]),
+                        (len(PIECES),) + shape)
+        for values in (prey, predators, valid)
+    )
+    # fixed points that do not exist may be infinite, which eigvals does not accept, so they are moved to the floors.
+    prey, predators = np.where(valid, prey, np.nan), np.where(valid, predators, np.nan)
+    safe_prey, safe_predators = np.where(valid, prey, MIN_PREY), np.where(valid, predators, MIN_PREDATORS)
+
+    eigenvalues = np.stack([
+        np.linalg.eigvals(jacobian(safe_prey[i], safe_predators[i], constants, free, delta_t)).astype(complex)
+        for i, free in enumerate(PIECES)
+    ])
+    stability = np.where(valid, classify(eigenvalues, discrete=delta_t is not None), MISSING)
+    return Equilibria(prey, predators, valid, eigenvalues, stability)
+
+
+def is_stable(stability: np.array) -> np.array:
+    """ Whether each fixed point exists and is stable, from the stability of Equilibria. """
+    return np.isin(stability, STABLE)
+
+
+def describe(equilibria: Equilibria) -> str:
+    """ Describes the fixed points that exist, for a single set of constants, e.g. as the apps report them. """
+    return '; '.join(
+        f'{name} at prey: {prey:.1f}, predators: {predators:.1f} ({CLASSES[stability]})'
+        for name, prey, predators, valid, stability in zip(FIXED_POINTS, *equilibria[:3], equilibria.stability)
+        if valid
+    )
+
+
+def bifurcation(
+        constants: Constants,
+        parameter: str,
+        values: np.array,
+        delta_t: Optional[float] = None,
+) -> Equilibria:
+    """ The fixed points of a model as one of its constants, or its step size, goes through the values.
+
+    :param constants: constants of the model, besides the parameter.
+    :param parameter: a field of Constants, or 'delta_t' for the step size of the difference equations.
+    :param values: values of the parameter.
+    :param delta_t: step size of the difference equations. None for the differential equations.
+    :return: the fixed points, with arrays of shape (len(FIXED_POINTS), len(values)).
+    """
+    values = np.asarray(values, dtype=float)
+    if parameter == 'delta_t':
+        if delta_t is None:
+            raise ValueError('delta_t is only a parameter of the difference equations.')
+        delta_t = values
+    elif parameter in Constants._fields:
+        constants = constants._replace(**{parameter: values})
+    else:
+        raise ValueError(f'parameter must be one of {list(Constants._fields) + ["delta_t"]}. Got {parameter} instead.')
+    return analyze(constants, delta_t)
+
+
+def plot_bifurcation(
+        axes: Sequence[Axes],
+        parameter: str,
+        values: np.array,
+        equilibria: Equilibria,
+        current: Optional[float] = None,
+):
+    """ Draws a bifurcation diagram: the prey and predators of every fixed point against the parameter.
+
+    Stable fixed points are drawn with solid lines and unstable ones with dashed lines, in one color per fixed point.
+
+    :param axes: the axes of the prey and of the predators.
+    :param parameter: name of the parameter.
+    :param values: values of the parameter, as given to bifurcation.
+    :param equilibria: the fixed points returned by bifurcation.
+    :param current: the value of the parameter to mark with a vertical line, if any.
+    """
+    stable = is_stable(equilibria.stability)
+    colors = ['black', 'blue', 'red', 'gray']
+    for ax, populations, label in zip(axes, (equilibria.prey, equilibria.predators), ('Prey', 'Predators')):
+        for i, name in enumerate(FIXED_POINTS):
+            if not np.any(equilibria.valid[i]):
+                continue
+            ax.plot(values, np.where(stable[i], populations[i], np.nan), c=colors[i], lw=1.5, label=name)
+            ax.plot(values, np.where(stable[i], np.nan, populations[i]), c=colors[i], lw=1.5, ls='--')
+        if current is not None:
+            ax.axvline(current, c='green', lw=0.75)
+        ax.set_ylabel(f'{label} at Equilibrium')
+    axes[0].set_title('Fixed points (solid if stable, dashed if unstable)')
+    axes[0].legend()
+    axes[-1].set_xlabel(parameter.replace('_', ' ').title())
+    return
@@ -1,27 +1,28 @@
-from typing import Tuple, List
+from typing import List
 
 import numpy as np
 import streamlit as st
-from matplotlib import pyplot as plt
-from scipy.integrate import odeint
+from matplotlib.figure import Figure
 
-from app import draw_phase_plot, get_isoclines
+from app import draw_bifurcation_diagram, draw_phase_plot, to_png
+from cache import PLOTS, TRAJECTORIES
+from equilibria import analyze, describe
+from model import TIMES, Constants, get_isoclines, solve_grid
 
 
-def draw_time_series(populations: List[np.array], times: np.array):
-    plt.clf()
-    fig = plt.figure(figsize=(8, 5), dpi=128)
-    fig.add_subplot(111)
+def draw_time_series(populations: List[np.array], times: np.array) -> bytes:
+    """ Draws the populations of every run against time, and returns the plot as PNG bytes. """
+    fig = Figure(figsize=(8, 5), dpi=128)
+    ax = fig.add_subplot(111)
 
     for run in populations:
-        plt.plot(times, run[0], c='blue', label='Prey Population', lw=0.75)
-        plt.plot(times, run[1], c='red', label='Predator Population', lw=0.75)
+        ax.plot(times, run[0], c='blue', label='Prey Population', lw=0.75)
+        ax.plot(times, run[1], c='red', label='Predator Population', lw=0.75)
 
-    plt.xlabel('Time')
-    plt.ylabel('Populations')
-    plt.title('Prey (Blue) and Predators (red) vs time')
-    st.pyplot(fig)
-    return
+    ax.set_xlabel('Time')
+    ax.set_ylabel('Populations')
+    ax.set_title('Prey (Blue) and Predators (red) vs time')
+    return to_png(fig)
 
 
 def main():
@@ -37,43 +38,31 @@ def main():
         death_rate = st.slider('Predator Death Rate', 0.01, 0.2, 0.05, 0.01, '%.2f')
     grid_size = st.slider('Starting Grid', 0, 20, 0, 2)
     grid_size = grid_size // 2
-
-    min_prey, min_predators = 3, 1
-
-    def solve(initial: Tuple[float, float], time: np.array) -> np.array:
-
-        def differential(_p: np.array, _) -> Tuple[float, float]:
-            [num_pogies, num_stripers] = list(_p)
-
-            pogies_delta = num_pogies * (reproduction_rate * (1 - num_pogies / prey_capacity) - consumption_rate * num_stripers)
-            pogies_delta = max(pogies_delta, 3 - num_pogies)
-
-            stripers_delta = num_stripers * (efficiency * consumption_rate * num_pogies - death_rate * num_stripers)
-            stripers_delta = max(stripers_delta, 1 - num_stripers)
-            return pogies_delta, stripers_delta
-
-        return np.asarray(odeint(differential, initial, time)).T
-
-    time_steps = np.arange(start=0, stop=100, step=0.25)
-    first_run = solve((3, 1), time_steps)
-    populations: List[np.array] = [first_run]
-
-    if grid_size > 0:
-        max_prey, max_predators = max(first_run[0]), max(first_run[1])
-        prey_step, predators_step = (max_prey - min_prey) / grid_size, (max_predators - min_predators) / grid_size
-        for x in range(1, 1 + grid_size):
-            for y in range(1, 1 + grid_size):
-                starting_prey = min_prey + prey_step * (x - 0.5 * (y % 2))
-                starting_predators = min_predators + predators_step * (y + 0.5 * (x % 2))
-                new_run = solve((starting_prey, starting_predators), time_steps)
-                populations.append(new_run)
-
-    constants = [reproduction_rate, prey_capacity, consumption_rate, efficiency, death_rate]
-    isoclines = get_isoclines((min(first_run[0]), max(first_run[0])), *constants)
-    st.write(f'The Equilibrium populations are: prey: {first_run[0][-1]:.1f}, predators: {first_run[1][-1]:.1f}')
-
-    draw_time_series(populations, time_steps)
-    draw_phase_plot(populations, isoclines)
+    switching = st.checkbox(
+        'Switch at the Floors',
+        value=False,
+        help='Integrates one smooth piece at a time. About as accurate, but 5 to 10 times slower. See solve_switching.',
+    )
+
+    constants = Constants(reproduction_rate, prey_capacity, consumption_rate, efficiency, death_rate)
+    time_steps = TIMES
+    populations = solve_grid(constants, time_steps, grid_size, switching, cache=TRAJECTORIES)
+    first_run = populations[0]
+    st.write(f'The Equilibria are: {describe(analyze(constants))}')
+
+    def phase_plot() -> bytes:
+        isoclines = get_isoclines((min(first_run[0]), max(first_run[0])), *constants)
+        return draw_phase_plot(populations, isoclines)
+
+    key = ('ode', constants, grid_size, switching)
+    st.image(PLOTS.get_or_compute(key + ('time_series',), lambda: draw_time_series(populations, time_steps)))
+    st.image(PLOTS.get_or_compute(key + ('phase',), phase_plot))
+
+    parameter = st.selectbox('Bifurcation Parameter', list(Constants._fields))
+    st.image(PLOTS.get_or_compute(
+        ('ode', 'bifurcation', constants, parameter),
+        lambda: draw_bifurcation_diagram(constants, parameter),
+    ))
     return
 
 
@@ -1,10 +1,14 @@
 import os
 from typing import List, Dict
 
+import matplotlib
 import numpy as np
-from matplotlib import pyplot as plt
 from scipy.linalg import solve
 
+# render off-screen, since the plots are only ever saved to files. The backend must be chosen before pyplot loads.
+matplotlib.use('Agg')
+from matplotlib import pyplot as plt  # noqa: E402
+
 BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), 'images'))
 
 PARTICIPANTS: List[str] = [
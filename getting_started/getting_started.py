@@ -1,5 +1,9 @@
+import matplotlib
 import numpy as np
-from matplotlib import pyplot as plt
+
+# render off-screen, since the plots are only ever saved to files. The backend must be chosen before pyplot loads.
+matplotlib.use('Agg')
+from matplotlib import pyplot as plt  # noqa: E402
 
 
 def sine_graphs():
@@ -0,0 +1,130 @@
+from typing import Sequence, Tuple
+
+import numpy as np
+from matplotlib.axes import Axes
+from matplotlib.collections import LineCollection
+from matplotlib.quiver import Quiver
+
+# striper_pogy and difference_equations both draw their phase plots with this module. See README.md.
+
+# number of points in an inch, to turn sizes in points into pixels at the dpi of a figure.
+POINTS_PER_INCH: float = 72.
+
+# largest number of vertices drawn over all trajectories. Past it, the trajectories are simplified more coarsely.
+MAX_VERTICES: int = 200_000
+
+# largest number of arrowheads drawn over all trajectories. Past it, the arrowheads are spaced out further.
+MAX_ARROWS: int = 2_000
+
+# number of vertices above which the trajectories are rasterized, if the figure is saved in a vector format.
+RASTERIZE_ABOVE: int = 20_000
+
+
+def _simplify(points: np.array, tolerance: float) -> np.array:
+    """ Drops the consecutive points of a path, in pixels, that fall in the same square of side `tolerance`.
+
+    A path that lingers in a small region, e.g. while it spirals into an equilibrium, keeps one point per square it
+    passes through, so the number of points left depends on the length of the path on the screen and not on the
+    number of time steps. The first and last points are always kept.
+    """
+    cells = np.floor(points / tolerance)
+    keep = np.ones(len(points), dtype=bool)
+    keep[1:] = np.any(cells[1:] != cells[:-1], axis=1)
+    keep[-1] = True
+    return points[keep]
+
+
+def _arrowheads(points: np.array, spacing: float) -> Tuple[np.array, np.array]:
+    """ Places arrowheads along a path, in pixels, one every `spacing` pixels of its length.
+
+    :return: the locations of the arrowheads, and the unit vectors of the direction of the path at each of them.
+    """
+    steps = np.diff(points, axis=0)
+    lengths = np.hypot(steps[:, 0], steps[:, 1])
+    moving = lengths > 0
+    steps, lengths, starts = steps[moving], lengths[moving], points[:-1][moving]
+    if len(lengths) == 0:
+        return np.zeros((0, 2)), np.zeros((0, 2))
+
+    # the index of the step during which the length of the path passes each multiple of the spacing.
+    distance = np.cumsum(lengths)
+    marks = np.arange(spacing / 2, distance[-1], spacing)
+    index = np.searchsorted(distance, marks)
+    return starts[index] + steps[index] / 2, steps[index] / lengths[index, None]
+
+
+def draw_trajectories(
+        ax: Axes,
+        runs: Sequence[np.array],
+        color: str = 'black',
+        linewidth: float = 0.75,
+        tolerance: float = 0.5,
+        arrow_spacing: float = 24.,
+        arrow_size: float = 5.,
+) -> Tuple[LineCollection, Quiver]:
+    """ Draws the paths of many trajectories as one LineCollection, with arrowheads that show their direction.
+
+    The time it takes is bounded whatever the number and length of the trajectories: the paths are simplified in
+    screen space before they are drawn, arrowheads are spaced along the paths on the screen rather than put on every
+    step, and both are thinned out further if there are still more than MAX_VERTICES vertices or MAX_ARROWS arrows.
+    The axes are scaled to the trajectories (and to anything already on them) before anything is drawn, since the
+    simplification depends on the scale.
+
+    :param ax: the axes to draw on.
+    :param runs: arrays of shape (2, time steps), with the x-values and y-values of each trajectory.
+    :param color: color of the paths and arrowheads.
+    :param linewidth: width of the paths, in points.
+    :param tolerance: size, in pixels, of the details of the paths that may be simplified away.
+    :param arrow_spacing: distance, in points, between the arrowheads along a path.
+    :param arrow_size: length, in points, of each arrowhead.
+    :return: the LineCollection of the paths and the Quiver of the arrowheads.
+    """
+    data = [np.column_stack([run[0], run[1]]) for run in runs if run.shape[1] > 0]
+    if len(data) > 0:
+        ax.update_datalim(np.concatenate(data))
+    ax.autoscale_view()
+    to_pixels = ax.transData
+    arrow_spacing, arrow_size = (value * ax.figure.dpi / POINTS_PER_INCH for value in (arrow_spacing, arrow_size))
+    pixels = [to_pixels.transform(points) for points in data]
+
+    paths = [_simplify(points, tolerance) for points in pixels]
+    while sum(len(path) for path in paths) > MAX_VERTICES:
+        tolerance *= 2
+        paths = [_simplify(points, tolerance) for points in paths]
+    num_vertices = sum(len(path) for path in paths)
+
+    arrows = [_arrowheads(path, arrow_spacing) for path in paths]
+    while sum(len(locations) for locations, _ in arrows) > MAX_ARROWS:
+        arrow_spacing *= 2
+        arrows = [_arrowheads(path, arrow_spacing) for path in paths]
+
+    from_pixels = to_pixels.inverted()
+    lines = LineCollection(
+        [from_pixels.transform(path) for path in paths],
+        colors=color,
+        linewidths=linewidth,
+    )
+    lines.set_rasterized(num_vertices > RASTERIZE_ABOVE)
+    ax.add_collection(lines, autolim=False)
+
+    locations = np.concatenate([np.zeros((0, 2))] + [locations for locations, _ in arrows])
+    directions = np.concatenate([np.zeros((0, 2))] + [directions for _, directions in arrows])
+    locations = from_pixels.transform(locations) if len(locations) > 0 else locations
+    heads = ax.quiver(
+        locations[:, 0],
+        locations[:, 1],
+        directions[:, 0],
+        directions[:, 1],
+        color=color,
+        angles='uv',  # the directions are measured on the screen, where 'uv' angles are.
+        pivot='mid',
+        scale_units='dots',
+        scale=1 / arrow_size,
+        # the head alone spans the whole arrow, so only an arrowhead shows.
+        width=arrow_size / 5,
+        units='dots',
+        headwidth=3.5,
+        headlength=5,
+        headaxislength=4.5,
+    )
+    return lines, heads
@@ -0,0 +1,197 @@
+import os
+import struct
+import zlib
+from abc import ABC, abstractmethod
+from typing import BinaryIO, Optional
+
+import numpy as np
+from PIL import Image, GifImagePlugin
+
+from renderer import PALETTE
+
+
+class FrameSink(ABC):
+    """ This class represents a destination to which frames of an animation are written as they are produced.
+
+    Frames are encoded and written immediately, so memory stays bounded however many frames are added.
+    """
+    def __init__(self, path: str, *, every: int = 1, resolution: int = 2 ** 12, duration: int = 1_000):
+        """ Creates a sink that writes to the given path.
+
+        :param path: file path (or directory, for frame files) to write to.
+        :param every: only every k-th time step is kept in the animation.
+        :param resolution: length, in pixels, of the longer side of each frame.
+        :param duration: each frame is shown for this many milliseconds.
+        """
+        if every < 1:
+            raise ValueError(f'must keep at least every frame. Got every={every} instead.')
+        if resolution < 1:
+            raise ValueError(f'resolution must be a positive number of pixels. Got {resolution} instead.')
+        if duration < 0:
+            raise ValueError(f'duration must be non-negative. Got {duration} instead.')
+        self.path: str = path
+        self.every: int = every
+        self.resolution: int = resolution
+        self.duration: int = duration
+        self.num_frames: int = 0
+
+    def __enter__(self) -> 'FrameSink':
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def wants(self, step: int) -> bool:
+        """ Whether the frame for the given (0-indexed) time step will be kept, so callers can skip drawing it. """
+        return step % self.every == 0
+
+    def _fit(self, frame: Image) -> Image:
+        """ Shrinks the frame, if needed, so that its longer side is no more than the resolution of the sink. """
+        if max(frame.size) <= self.resolution:
+            return frame
+        scale = self.resolution / max(frame.size)
+        return frame.resize((max(1, round(frame.width * scale)), max(1, round(frame.height * scale))))
+
+    def add(self, step: int, frame: Image) -> bool:
+        """ Encodes and writes the frame for the given time step, unless it is decimated away.
+
+        :param step: 0-indexed time step that the frame shows.
+        :param frame: the frame to write.
+        :return: whether the frame was written.
+        """
+        if not self.wants(step):
+            return False
+        self._write(self._fit(frame))
+        self.num_frames += 1
+        return True
+
+    @abstractmethod
+    def _write(self, frame: Image):
+        pass
+
+    @abstractmethod
+    def close(self):
+        pass
+
+
+class GifSink(FrameSink):
+    """ Writes frames, one at a time, into a GIF with the fixed global palette of the Renderer.
+
+    Frames drawn by the Renderer already use that palette and are written as they are. Other frames are quantized.
+    """
+    def __init__(self, path: str, **kwargs):
+        super().__init__(path, **kwargs)
+        self._palette: Image = Image.new(mode='P', size=(1, 1))
+        self._palette.putpalette([c for color in PALETTE for c in color])
+        self._fp: Optional[BinaryIO] = None
+
+    def _write(self, frame: Image):
+        if (frame.mode != 'P') or (frame.getpalette() != self._palette.getpalette()):
+            frame = frame.convert('RGB').quantize(palette=self._palette, dither=Image.Dither.NONE)
+        if self._fp is None:
+            self._fp = open(self.path, 'wb')
+            canvas = Image.new(mode='P', size=frame.size)
+            canvas.putpalette(self._palette.getpalette())
+            header, _ = GifImagePlugin.getheader(canvas, info={'duration': self.duration, 'optimize': False})
+            [self._fp.write(block) for block in header]
+        [self._fp.write(block) for block in GifImagePlugin.getdata(frame, duration=self.duration)]
+        return
+
+    def close(self):
+        if self._fp is not None:
+            self._fp.write(b';')  # trailer
+            self._fp.close()
+            self._fp = None
+        return
+
+
+class ApngSink(FrameSink):
+    """ Writes frames, one at a time, into an animated PNG.
+
+    The number of frames is only known at the end, so it is patched into the header when the sink is closed.
+    """
+    def __init__(self, path: str, *, compression: int = 6, **kwargs):
+        """
+        :param compression: zlib compression level for the frames.
+        """
+        super().__init__(path, **kwargs)
+        self.compression: int = compression
+        self._fp: Optional[BinaryIO] = None
+        self._sequence: int = 0
+        self._actl_offset: int = 0
+
+    def _chunk(self, kind: bytes, data: bytes):
+        self._fp.write(struct.pack('>I', len(data)) + kind + data)
+        self._fp.write(struct.pack('>I', zlib.crc32(kind + data) & 0xFFFFFFFF))
+        return
+
+    def _write(self, frame: Image):
+        pixels = np.asarray(frame.convert('RGB'), dtype=np.uint8)
+        height, width = pixels.shape[:2]
+        if self._fp is None:
+            self._fp = open(self.path, 'wb')
+            self._fp.write(b'\x89PNG\r\n\x1a\n')
+            self._chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+            self._actl_offset = self._fp.tell()
+            self._chunk(b'acTL', struct.pack('>II', 0, 0))
+
+        # every row starts with filter type 0 (none).
+        rows = np.zeros(shape=(height, 1 + 3 * width), dtype=np.uint8)
+        rows[:, 1:] = pixels.reshape(height, 3 * width)
+        data = zlib.compress(rows.tobytes(), self.compression)
+
+        self._chunk(b'fcTL', struct.pack('>IIIIIHHBB', self._sequence, width, height, 0, 0, self.duration, 1000, 0, 0))
+        self._sequence += 1
+        if self.num_frames == 0:
+            self._chunk(b'IDAT', data)
+        else:
+            self._chunk(b'fdAT', struct.pack('>I', self._sequence) + data)
+            self._sequence += 1
+        return
+
+    def close(self):
+        if self._fp is not None:
+            self._chunk(b'IEND', b'')
+            self._fp.seek(self._actl_offset)
+            self._chunk(b'acTL', struct.pack('>II', self.num_frames, 0))
+            self._fp.close()
+            self._fp = None
+        return
+
+
+class FrameFilesSink(FrameSink):
+    """ Writes each frame to its own image file in a directory. """
+    def __init__(self, path: str, *, extension: str = 'png', **kwargs):
+        """
+        :param extension: file extension, and so format, of the frame files.
+        """
+        super().__init__(path, **kwargs)
+        self.extension: str = extension
+        os.makedirs(path, exist_ok=True)
+
+    def _write(self, frame: Image):
+        frame.save(os.path.join(self.path, f'frame__{self.num_frames:05d}.{self.extension}'))
+        return
+
+    def close(self):
+        return
+
+
+def open_sink(path: str, **kwargs) -> FrameSink:
+    """ Opens the frame sink that matches the extension of the path.
+
+    '.gif' opens a GifSink, '.png' or '.apng' opens an ApngSink, and a path without an extension opens a FrameFilesSink.
+
+    :param path: file path to write the animation to.
+    :param kwargs: passed on to the sink. See FrameSink.
+    :return: the opened frame sink.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.gif':
+        return GifSink(path, **kwargs)
+    elif extension in ('.png', '.apng'):
+        return ApngSink(path, **kwargs)
+    elif extension == '':
+        return FrameFilesSink(path, **kwargs)
+    else:
+        raise ValueError(f'Cannot write an animation with extension {extension}. Use .gif, .png, .apng or none.')
@@ -0,0 +1,170 @@
+import numpy as np
+from typing import Dict, List, Tuple, Optional
+
+from board import Board
+from metrics import NullMetrics
+from params import *
+from renderer import Species
+from school import School
+from spatial import CellGrid
+from utils import Size
+
+
+class ArrayBoard(Board):
+    """ A Board that stores each species as a School of NumPy arrays instead of a set of Fish objects.
+
+    The rules of the game are the same as for the Board; only the bookkeeping is vectorized.
+    """
+    def __init__(
+            self,
+            size: Size,
+            prey_capacity: int,
+            *,  # any arguments after '*' must be passed by name.
+            starting_prey: int = STARTING_PREY,
+            starting_predators: int = STARTING_PREDATORS,
+            fishery: Optional[float] = FISHERY,
+            reproduction_rate: float = PREY_REPRODUCTION_RATE,
+            food_requirement: float = PREDATOR_FOOD_REQUIREMENTS,
+            rng: Optional[np.random.Generator] = None,
+            metrics: Optional[NullMetrics] = None,
+    ):
+        """ Initializes a board with a given size.
+
+        :param size: The (width, height) of board to use.
+        :param prey_capacity: carrying capacity of the prey.
+        :param starting_prey: number of prey with which to start a simulation.
+        :param starting_predators: number of predators with which to start a simulation.
+        :param fishery: fraction of prey to remove each time step dur to fishing.
+        :param reproduction_rate: chance that an uneaten prey has two children instead of one, away from the capacity.
+        :param food_requirement: number of prey that a predator must eat for each of its children.
+        :param rng: the random number generator that drives the board. A fresh, unseeded one is made if not given.
+        :param metrics: optional StepMetrics that records the time and counters of each phase of every step.
+        """
+        super().__init__(
+            size,
+            prey_capacity,
+            starting_prey=starting_prey,
+            starting_predators=starting_predators,
+            fishery=fishery,
+            reproduction_rate=reproduction_rate,
+            food_requirement=food_requirement,
+            rng=rng,
+            metrics=metrics,
+        )
+        self.prey: School = School(PREY_SIZE, fill=(0, 0, 255))  # blue
+        self.predators: School = School(PREDATOR_SIZE, fill=(255, 0, 0))  # red
+
+    def _count_survivors(self) -> Tuple[int, int]:
+        num_prey = int(np.count_nonzero(self.prey.children))
+        num_predators = int(np.count_nonzero(self.predators.children))
+        return num_prey, num_predators
+
+    def _feed(self):
+        """ Lets every predator eat all the uneaten prey it touches.
+
+        Only the prey in the cells of a CellGrid around each predator are checked.
+        Predators feed in index order, so a prey touched by several predators is claimed by the first of them.
+        """
+        x_margin: float = (self.predators.width + self.prey.width) / 2
+        y_margin: float = (self.predators.height + self.prey.height) / 2
+
+        grid = CellGrid(self.prey.x, self.prey.y, cell_size=Size(x_margin, y_margin), board_size=self.size)
+        predators, prey = grid.pairs(self.predators.x, self.predators.y)
+        self.metrics.count('contact_tests', len(prey))
+        touches = np.abs(self.predators.x[predators] - self.prey.x[prey]) <= x_margin
+        touches &= np.abs(self.predators.y[predators] - self.prey.y[prey]) <= y_margin
+        predators, prey = predators[touches], prey[touches]
+
+        # pairs are sorted by predator, so the first pair for each prey names the predator that claims it.
+        prey, first = np.unique(prey, return_index=True)
+        self.prey.got_eaten[prey] = True
+        self.predators.num_eaten[:] = np.bincount(predators[first], minlength=len(self.predators))
+        self.metrics.count('prey_eaten', len(prey))
+        return
+
+    def _reproduce_prey(self, rate: float):
+        """ Each prey that was not eaten has one or two children, depending on the reproduction rate. """
+        if rate < 0:
+            raise ValueError(f'Prey reproduction rate must be a non-negative number. Got {rate:.3f} instead.')
+        coins = self.rng.uniform(size=len(self.prey))
+        self.prey.children[:] = np.where(self.prey.got_eaten, 0, np.where(coins > rate, 1, 2))
+        return
+
+    def _reproduce_predators(self, food_requirement: float):
+        """ Each predator has as many children as the number of times it met the food requirement. """
+        if food_requirement < 0:
+            raise ValueError(f'Predator food requirements must be positive. Got {food_requirement:.3f} instead.')
+        self.predators.children[:] = np.floor(self.predators.num_eaten / food_requirement)
+        return
+
+    def step(self) -> Tuple[int, int]:
+        """
+        Move the board forward by one time-step.
+        This method also handles the edge case of the first time step.
+
+        :return: numbers of prey and predators that survived the round.
+        """
+        self.metrics.start()
+
+        # Create new school of prey fish
+        new_prey = int(self.prey.children.sum())
+        new_prey = min(new_prey, self.prey_capacity)
+        if new_prey == 0:
+            new_prey = self.starting_prey
+        self.prey.spawn(new_prey, self.size, self.rng)
+        self.metrics.count('prey_spawned', new_prey)
+        self.metrics.lap('spawn_prey')
+
+        # Create new school of predator fish
+        new_predators = int(self.predators.children.sum())
+        if new_predators == 0:
+            new_predators = self.starting_predators
+        self.predators.spawn(new_predators, self.size, self.rng)
+        self.metrics.count('predators_spawned', new_predators)
+        self.metrics.lap('spawn_predators')
+
+        # Let the predators feed on the prey
+        self._feed()
+        self.metrics.lap('feed')
+
+        # apply fishery
+        if self.fishery is not None:
+            fished = (self.rng.uniform(size=len(self.prey)) < self.fishery) & ~self.prey.got_eaten
+            self.prey.got_eaten |= fished
+            self.metrics.count('prey_fished', np.count_nonzero(fished))
+        self.metrics.lap('fishery')
+
+        # adjust the reproduction rate of prey if their population is too close to the carrying capacity
+        if len(self.prey) < (self.prey_capacity / (1 + self.reproduction_rate)):
+            reproduction_rate = self.reproduction_rate
+        else:
+            reproduction_rate = self.prey_capacity / len(self.prey) - 1
+        self.metrics.lap('capacity')
+
+        # Let the fish reproduce
+        self._reproduce_prey(reproduction_rate)
+        self._reproduce_predators(self.food_requirement)
+        self.metrics.lap('reproduce')
+
+        survivors = self._count_survivors()
+        self.metrics.lap('count_survivors')
+        self.metrics.finish()
+        return survivors
+
+    def state(self) -> Dict[str, np.ndarray]:
+        state: Dict[str, np.ndarray] = dict()
+        for name, school in (('prey', self.prey), ('predator', self.predators)):
+            state.update({f'{name}_{field}': array.copy() for field, array in school.arrays().items()})
+        return state
+
+    def load_state(self, state: Dict[str, np.ndarray]):
+        for name, school in (('prey', self.prey), ('predator', self.predators)):
+            school.restore(**{field: state[f'{name}_{field}'] for field in School.FIELDS})
+        return
+
+    def _species(self) -> List[Species]:
+        """ The fish on the board as arrays, one entry per species, in the order in which they are drawn. """
+        return [
+            (school.x, school.y, school.children > 0, school.size, school.fill, school.outline)
+            for school in (self.prey, self.predators)
+        ]
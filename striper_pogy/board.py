@@ -1,11 +1,14 @@
 import numpy as np
-from typing import Set, Tuple, Optional
+from typing import Dict, List, Set, Tuple, Optional
 
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image
 
 from fish import Predator, Prey
+from metrics import NULL_METRICS, NullMetrics
 from params import *
-from utils import Size
+from renderer import Renderer, Species
+from spatial import CellGrid
+from utils import Location, Size
 
 
 class Board:
@@ -16,7 +19,11 @@ class Board:
             *,  # any arguments after '*' must be passed by name.
             starting_prey: int = STARTING_PREY,
             starting_predators: int = STARTING_PREDATORS,
-            fishery: Optional[float] = FISHERY
+            fishery: Optional[float] = FISHERY,
+            reproduction_rate: float = PREY_REPRODUCTION_RATE,
+            food_requirement: float = PREDATOR_FOOD_REQUIREMENTS,
+            rng: Optional[np.random.Generator] = None,
+            metrics: Optional[NullMetrics] = None,
     ):
         """ Initializes a board with a given size.
 
@@ -25,6 +32,10 @@ class Board:
         :param starting_prey: number of prey with which to start a simulation.
         :param starting_predators: number of predators with which to start a simulation.
         :param fishery: fraction of prey to remove each time step dur to fishing.
+        :param reproduction_rate: chance that an uneaten prey has two children instead of one, away from the capacity.
+        :param food_requirement: number of prey that a predator must eat for each of its children.
+        :param rng: the random number generator that drives the board. A fresh, unseeded one is made if not given.
+        :param metrics: optional StepMetrics that records the time and counters of each phase of every step.
         """
         if any((s <= 0 for s in size)):
             raise ValueError(f'The dimensions of the board must be positive numbers. Got ({size} instead')
@@ -47,8 +58,20 @@ class Board:
                 raise ValueError(f'fishery fraction must be between 0 and 1. Got {fishery:.2f} instead.')
         self.fishery: Optional[float] = fishery
 
-        self.prey: Set[Prey] = set()
-        self.predators: Set[Predator] = set()
+        if not (0 <= reproduction_rate <= 1):
+            raise ValueError(f'reproduction rate must be between 0 and 1. Got {reproduction_rate:.2f} instead.')
+        self.reproduction_rate: float = reproduction_rate
+
+        if not (food_requirement > 0):
+            raise ValueError(f'food requirement must be a positive number. Got {food_requirement} instead.')
+        self.food_requirement: float = food_requirement
+
+        self.rng: np.random.Generator = np.random.default_rng() if rng is None else rng
+        self.renderer: Renderer = Renderer()
+        self.metrics: NullMetrics = NULL_METRICS if metrics is None else metrics
+
+        self.prey: List[Prey] = list()
+        self.predators: List[Predator] = list()
 
     @property
     def width(self) -> float:
@@ -63,6 +86,33 @@ class Board:
         num_predators = sum((predator.children > 0 for predator in self.predators))
         return num_prey, num_predators
 
+    def _feed(self):
+        """ Lets every predator eat all the uneaten prey it touches.
+
+        Only the prey in the cells of a CellGrid around each predator are checked.
+        Predators feed in order, so a prey touched by several predators is eaten by the first of them.
+        """
+        prey, predators = self.prey, self.predators
+        grid = CellGrid(
+            x=np.array([fish.x for fish in prey]),
+            y=np.array([fish.y for fish in prey]),
+            cell_size=Size((PREDATOR_SIZE.width + PREY_SIZE.width) / 2, (PREDATOR_SIZE.height + PREY_SIZE.height) / 2),
+            board_size=self.size,
+        )
+        nearby = grid.candidates(
+            x=np.array([fish.x for fish in predators]),
+            y=np.array([fish.y for fish in predators]),
+        )
+        for predator, candidates in zip(predators, nearby):
+            # find all the prey that the predator will eat.
+            food: Set[Prey] = {prey[i] for i in candidates if (not prey[i].got_eaten) and predator.touches(prey[i])}
+            predator.eat(food)
+
+        if self.metrics.enabled:
+            self.metrics.count('contact_tests', sum((len(candidates) for candidates in nearby)))
+            self.metrics.count('prey_eaten', sum((fish.got_eaten for fish in prey)))
+        return
+
     def step(self) -> Tuple[int, int]:
         """
         Move the board forward by one time-step.
@@ -70,64 +120,118 @@ class Board:
 
         :return: numbers of prey and predators that survived the round.
         """
-        # Create new set of prey fish
+        self.metrics.start()
+
+        # Create new prey fish
         new_prey = sum((prey.children for prey in self.prey))
         new_prey = min(new_prey, self.prey_capacity)
         if new_prey == 0:
             new_prey = self.starting_prey
-        self.prey = set()
-        while len(self.prey) < new_prey:
-            self.prey.add(Prey(board_size=self.size))
+        self.prey = Prey.spawn(new_prey, self.size, self.rng)
+        self.metrics.count('prey_spawned', new_prey)
+        self.metrics.lap('spawn_prey')
 
-        # Create new set of predator fish
+        # Create new predator fish
         new_predators = sum((predator.children for predator in self.predators))
         if new_predators == 0:
             new_predators = self.starting_predators
-        self.predators = set()
-        while len(self.predators) < new_predators:
-            self.predators.add(Predator(board_size=self.size))
+        self.predators = Predator.spawn(new_predators, self.size, self.rng)
+        self.metrics.count('predators_spawned', new_predators)
+        self.metrics.lap('spawn_predators')
 
         # Let the predators feed on the prey
-        for predator in self.predators:
-            # find all the prey that the predator will eat.
-            food: Set[Prey] = set()
-            for prey in self.prey:
-                if (not prey.got_eaten) and predator.touches(prey):
-                    food.add(prey)
-            predator.eat(food)
+        self._feed()
+        self.metrics.lap('feed')
 
         # apply fishery
         if self.fishery is not None:
-            for prey in self.prey:
-                if (not prey.got_eaten) and (np.random.uniform() < self.fishery):
+            num_fished = 0
+            for prey, coin in zip(self.prey, self.rng.uniform(size=len(self.prey))):
+                if (not prey.got_eaten) and (coin < self.fishery):
                     prey.got_eaten = True
+                    num_fished += 1
+            self.metrics.count('prey_fished', num_fished)
+        self.metrics.lap('fishery')
 
         # adjust the reproduction rate of prey if their population is too close to the carrying capacity
-        if len(self.prey) < (self.prey_capacity / (1 + PREY_REPRODUCTION_RATE)):
-            reproduction_rate = PREY_REPRODUCTION_RATE
+        if len(self.prey) < (self.prey_capacity / (1 + self.reproduction_rate)):
+            reproduction_rate = self.reproduction_rate
         else:
             reproduction_rate = self.prey_capacity / len(self.prey) - 1
+        self.metrics.lap('capacity')
 
         # Let the fish reproduce
-        [prey.reproduce(reproduction_rate) for prey in self.prey]
-        [predator.reproduce() for predator in self.predators]
-
-        return self._count_survivors()
+        coins = self.rng.uniform(size=len(self.prey))
+        [prey.reproduce(reproduction_rate, coin=coin) for prey, coin in zip(self.prey, coins)]
+        [predator.reproduce(self.food_requirement) for predator in self.predators]
+        self.metrics.lap('reproduce')
 
-    def draw(self) -> Image:
-        scale: float = (2 ** 12) // max(self.size)
-        image_size = self.width * scale, self.height * scale
-        im: Image = Image.new(mode='RGB', size=image_size, color='white')
-        draw: ImageDraw = ImageDraw.Draw(im=im)
+        survivors = self._count_survivors()
+        self.metrics.lap('count_survivors')
+        self.metrics.finish()
+        return survivors
 
-        [fish.draw(draw, scale) for fish in self.prey]
-        [fish.draw(draw, scale) for fish in self.predators]
+    def state(self) -> Dict[str, np.ndarray]:
+        """ The fish on the board as arrays, enough to restore the board with load_state.
 
+        The keys are '{species}_{field}', for the species 'prey' and 'predator' and the fields 'x', 'y', 'got_eaten',
+        'num_eaten' and 'children', so the state of any engine can be loaded into any other.
+        """
+        state: Dict[str, np.ndarray] = dict()
+        for name, fish in (('prey', self.prey), ('predator', self.predators)):
+            state[f'{name}_x'] = np.array([f.x for f in fish], dtype=np.float64)
+            state[f'{name}_y'] = np.array([f.y for f in fish], dtype=np.float64)
+            state[f'{name}_got_eaten'] = np.array([getattr(f, 'got_eaten', False) for f in fish], dtype=bool)
+            state[f'{name}_num_eaten'] = np.array([getattr(f, 'num_eaten', 0) for f in fish], dtype=np.int32)
+            state[f'{name}_children'] = np.array([f.children for f in fish], dtype=np.int32)
+        return state
+
+    def load_state(self, state: Dict[str, np.ndarray]):
+        """ Replaces the fish on the board with those in a state returned by the state method. """
+        self.prey = [
+            Prey(self.size, PREY_SIZE, location=Location(x, y))
+            for x, y in zip(state['prey_x'].tolist(), state['prey_y'].tolist())
+        ]
+        for prey, got_eaten, children in zip(self.prey, state['prey_got_eaten'], state['prey_children'].tolist()):
+            prey.got_eaten, prey.children = bool(got_eaten), children
+
+        self.predators = [
+            Predator(self.size, PREDATOR_SIZE, location=Location(x, y))
+            for x, y in zip(state['predator_x'].tolist(), state['predator_y'].tolist())
+        ]
+        num_eaten, children = state['predator_num_eaten'].tolist(), state['predator_children'].tolist()
+        for predator, n, c in zip(self.predators, num_eaten, children):
+            predator.num_eaten, predator.children = n, c
+        return
+
+    def _species(self) -> List[Species]:
+        """ The fish on the board as arrays, one entry per species, in the order in which they are drawn. """
+        species: List[Species] = list()
+        colors = {Prey: (0, 0, 255), Predator: (255, 0, 0)}  # blue and red
+        for fish, fish_size, kind in ((self.prey, PREY_SIZE, Prey), (self.predators, PREDATOR_SIZE, Predator)):
+            species.append((
+                np.array([f.x for f in fish], dtype=float),
+                np.array([f.y for f in fish], dtype=float),
+                np.array([f.children > 0 for f in fish], dtype=bool),
+                fish_size,
+                colors[kind],
+                (0, 0, 0),
+            ))
+        return species
+
+    def draw(self, resolution: int = 2 ** 12) -> Image:
+        """ Draws one frame of the animation, showing everything that happened in the last time-step.
+
+        :param resolution: length, in pixels, of the longer side of the frame.
+        :return: the drawn frame.
+        """
+        scale: float = max(1, resolution // max(self.size))
         num_prey, num_predators = self._count_survivors()
-        draw.text(
-            xy=(64, 32),
+        return self.renderer.draw(
+            image_size=(int(self.width * scale), int(self.height * scale)),
+            scale=scale,
+            species=self._species(),
             text=f'Survivors:\nPrey: {num_prey}\nPredators: {num_predators}',
-            fill=(0, 255, 0),  # Green text
-            font=ImageFont.truetype(font='./arial.ttf', size=64)
+            text_xy=(resolution // 64, resolution // 128),
+            text_size=max(1, resolution // 64),
         )
-        return im
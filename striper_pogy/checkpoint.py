@@ -0,0 +1,67 @@
+import json
+import os
+from collections import namedtuple
+from typing import Any, Dict
+
+import numpy as np
+
+from board import Board
+
+# everything needed to resume a simulation: the number of finished steps, the populations so far, the state of the
+# board (see Board.state), the state of its random number generator, and the settings of the run.
+Checkpoint = namedtuple('Checkpoint', 'step populations board rng settings')
+
+# prefix of the keys under which the state of the board is stored in a checkpoint file.
+_BOARD_PREFIX: str = 'board__'
+
+
+def save_checkpoint(path: str, board: Board, step: int, populations: np.array, **settings: Any):
+    """ Writes a checkpoint of a simulation to an uncompressed .npz file.
+
+    The file is written next to its final path and then moved into place, so a run that is killed while saving
+    leaves the previous checkpoint intact.
+
+    :param path: file path of the checkpoint. Should end in '.npz'.
+    :param board: the board being simulated.
+    :param step: number of time steps already simulated.
+    :param populations: array of the populations, of which the first `step` columns are filled in.
+    :param settings: JSON-serializable settings of the run, checked when the run is resumed.
+    """
+    arrays: Dict[str, np.ndarray] = {_BOARD_PREFIX + key: value for key, value in board.state().items()}
+    temp_path = f'{path}.tmp'
+    with open(temp_path, 'wb') as fp:
+        np.savez(
+            fp,
+            step=np.int64(step),
+            populations=populations[..., :step],
+            rng=np.array(json.dumps(board.rng.bit_generator.state)),
+            settings=np.array(json.dumps(settings)),
+            **arrays,
+        )
+        fp.flush()
+        os.fsync(fp.fileno())
+    os.replace(temp_path, path)
+    return
+
+
+def load_checkpoint(path: str) -> Checkpoint:
+    """ Reads a checkpoint written by save_checkpoint.
+
+    :param path: file path of the checkpoint.
+    :return: the checkpoint.
+    """
+    with np.load(path) as data:
+        return Checkpoint(
+            step=int(data['step']),
+            populations=data['populations'],
+            board={key[len(_BOARD_PREFIX):]: data[key] for key in data.files if key.startswith(_BOARD_PREFIX)},
+            rng=json.loads(str(data['rng'])),
+            settings=json.loads(str(data['settings'])),
+        )
+
+
+def restore(board: Board, checkpoint: Checkpoint):
+    """ Puts the board and its random number generator back in the state in which they were checkpointed. """
+    board.load_state(checkpoint.board)
+    board.rng.bit_generator.state = checkpoint.rng
+    return
@@ -0,0 +1,199 @@
+import numpy as np
+from typing import Dict, Optional, Tuple
+
+from array_board import ArrayBoard
+from metrics import NullMetrics
+from params import *
+from spatial import CellGrid
+from utils import Size
+
+
+class EnsembleBoard(ArrayBoard):
+    """ Many independent replicas of an ArrayBoard, advanced together.
+
+    The per-replica quantities (population counts, reproduction rates, survivors) are arrays with the replica as their
+    leading axis. The fish of all replicas share one School per species, stored replica after replica, and the
+    `prey_replica` and `predator_replica` arrays record the replica to which each fish belongs.
+    """
+    def __init__(
+            self,
+            size: Size,
+            prey_capacity: int,
+            num_replicas: int,
+            *,  # any arguments after '*' must be passed by name.
+            starting_prey: int = STARTING_PREY,
+            starting_predators: int = STARTING_PREDATORS,
+            fishery: Optional[float] = FISHERY,
+            reproduction_rate: float = PREY_REPRODUCTION_RATE,
+            food_requirement: float = PREDATOR_FOOD_REQUIREMENTS,
+            rng: Optional[np.random.Generator] = None,
+            metrics: Optional[NullMetrics] = None,
+    ):
+        """ Initializes an ensemble of boards with a given size.
+
+        :param size: The (width, height) of each board.
+        :param prey_capacity: carrying capacity of the prey on each board.
+        :param num_replicas: number of independent boards to simulate.
+        :param starting_prey: number of prey with which to start a simulation.
+        :param starting_predators: number of predators with which to start a simulation.
+        :param fishery: fraction of prey to remove each time step dur to fishing.
+        :param reproduction_rate: chance that an uneaten prey has two children instead of one, away from the capacity.
+        :param food_requirement: number of prey that a predator must eat for each of its children.
+        :param rng: the random number generator that drives the board. A fresh, unseeded one is made if not given.
+        :param metrics: optional StepMetrics that records the time and counters of each phase of every step.
+        """
+        super().__init__(
+            size,
+            prey_capacity,
+            starting_prey=starting_prey,
+            starting_predators=starting_predators,
+            fishery=fishery,
+            reproduction_rate=reproduction_rate,
+            food_requirement=food_requirement,
+            rng=rng,
+            metrics=metrics,
+        )
+        if not (num_replicas > 0):
+            raise ValueError(f'Must simulate at least one replica. Got {num_replicas} instead')
+        self.num_replicas: int = num_replicas
+
+        self.prey_replica: np.ndarray = np.empty(0, dtype=np.int64)
+        self.predator_replica: np.ndarray = np.empty(0, dtype=np.int64)
+
+    def _per_replica(self, values: np.ndarray, replica: np.ndarray) -> np.ndarray:
+        """ Sums the given per-fish values over the fish of each replica. """
+        return np.bincount(replica, weights=values, minlength=self.num_replicas).astype(np.int64)
+
+    def _count_survivors(self) -> np.ndarray:
+        num_prey = self._per_replica(self.prey.children > 0, self.prey_replica)
+        num_predators = self._per_replica(self.predators.children > 0, self.predator_replica)
+        return np.stack([num_prey, num_predators], axis=1)
+
+    def _feed(self):
+        """ Lets every predator eat all the uneaten prey it touches on its own board.
+
+        The boards are laid side by side, with a gap wider than any contact margin, and indexed by a single CellGrid.
+        Predators feed in index order, so a prey touched by several predators is claimed by the first of them.
+        """
+        x_margin: float = (self.predators.width + self.prey.width) / 2
+        y_margin: float = (self.predators.height + self.prey.height) / 2
+
+        stride = self.width + 2 * x_margin
+        prey_x = self.prey.x + stride * self.prey_replica
+        predator_x = self.predators.x + stride * self.predator_replica
+
+        grid = CellGrid(
+            prey_x,
+            self.prey.y,
+            cell_size=Size(x_margin, y_margin),
+            board_size=Size(stride * self.num_replicas, self.height),
+        )
+        predators, prey = grid.pairs(predator_x, self.predators.y)
+        self.metrics.count('contact_tests', len(prey))
+        touches = np.abs(predator_x[predators] - prey_x[prey]) <= x_margin
+        touches &= np.abs(self.predators.y[predators] - self.prey.y[prey]) <= y_margin
+        predators, prey = predators[touches], prey[touches]
+
+        # pairs are sorted by predator, so the first pair for each prey names the predator that claims it.
+        prey, first = np.unique(prey, return_index=True)
+        self.prey.got_eaten[prey] = True
+        self.predators.num_eaten[:] = np.bincount(predators[first], minlength=len(self.predators))
+        self.metrics.count('prey_eaten', len(prey))
+        return
+
+    def next_counts(self) -> Tuple[np.ndarray, np.ndarray]:
+        """ The numbers of prey and predators to spawn on each board in the next time-step.
+
+        These counts are all that carries over from one time-step to the next, because every fish is dropped anew.
+        This method also handles the edge case of the first time step.
+
+        :return: arrays of shape (num_replicas,) with the numbers of prey and of predators.
+        """
+        new_prey = self._per_replica(self.prey.children, self.prey_replica)
+        new_prey = np.minimum(new_prey, self.prey_capacity)
+        new_prey[new_prey == 0] = self.starting_prey
+
+        new_predators = self._per_replica(self.predators.children, self.predator_replica)
+        new_predators[new_predators == 0] = self.starting_predators
+        return new_prey, new_predators
+
+    def step(self) -> np.ndarray:
+        """
+        Move every board in the ensemble forward by one time-step.
+        This method also handles the edge case of the first time step.
+
+        :return: array of shape (num_replicas, 2) with the numbers of prey and predators that survived the round.
+        """
+        return self.step_from(*self.next_counts())
+
+    def step_from(self, new_prey: np.ndarray, new_predators: np.ndarray) -> np.ndarray:
+        """
+        Move every board in the ensemble forward by one time-step, starting with the given numbers of fish.
+
+        :param new_prey: array of shape (num_replicas,) with the number of prey to spawn on each board.
+        :param new_predators: array of shape (num_replicas,) with the number of predators to spawn on each board.
+        :return: array of shape (num_replicas, 2) with the numbers of prey and predators that survived the round.
+        """
+        new_prey = np.asarray(new_prey, dtype=np.int64)
+        new_predators = np.asarray(new_predators, dtype=np.int64)
+        if (new_prey.shape != (self.num_replicas,)) or (new_predators.shape != (self.num_replicas,)):
+            raise ValueError(f'need one count per replica. Got {new_prey.shape} and {new_predators.shape} instead.')
+        self.metrics.start()
+
+        # Create new schools of prey fish
+        self.prey.spawn(int(new_prey.sum()), self.size, self.rng)
+        self.prey_replica = np.repeat(np.arange(self.num_replicas), new_prey)
+        self.metrics.count('prey_spawned', len(self.prey))
+        self.metrics.lap('spawn_prey')
+
+        # Create new schools of predator fish
+        self.predators.spawn(int(new_predators.sum()), self.size, self.rng)
+        self.predator_replica = np.repeat(np.arange(self.num_replicas), new_predators)
+        self.metrics.count('predators_spawned', len(self.predators))
+        self.metrics.lap('spawn_predators')
+
+        # Let the predators feed on the prey
+        self._feed()
+        self.metrics.lap('feed')
+
+        # apply fishery
+        if self.fishery is not None:
+            fished = (self.rng.uniform(size=len(self.prey)) < self.fishery) & ~self.prey.got_eaten
+            self.prey.got_eaten |= fished
+            self.metrics.count('prey_fished', np.count_nonzero(fished))
+        self.metrics.lap('fishery')
+
+        # adjust the reproduction rate of prey if their population is too close to the carrying capacity
+        reproduction_rate = np.where(
+            new_prey < (self.prey_capacity / (1 + self.reproduction_rate)),
+            self.reproduction_rate,
+            self.prey_capacity / new_prey - 1,
+        )
+        self.metrics.lap('capacity')
+
+        # Let the fish reproduce
+        coins = self.rng.uniform(size=len(self.prey))
+        twins = coins <= reproduction_rate[self.prey_replica]
+        self.prey.children[:] = np.where(self.prey.got_eaten, 0, np.where(twins, 2, 1))
+        self._reproduce_predators(self.food_requirement)
+        self.metrics.lap('reproduce')
+
+        survivors = self._count_survivors()
+        self.metrics.lap('count_survivors')
+        self.metrics.finish()
+        return survivors
+
+    def state(self) -> Dict[str, np.ndarray]:
+        state = super().state()
+        state['prey_replica'] = self.prey_replica.copy()
+        state['predator_replica'] = self.predator_replica.copy()
+        return state
+
+    def load_state(self, state: Dict[str, np.ndarray]):
+        super().load_state(state)
+        self.prey_replica = np.asarray(state['prey_replica'], dtype=np.int64)
+        self.predator_replica = np.asarray(state['predator_replica'], dtype=np.int64)
+        return
+
+    def draw(self):
+        raise NotImplementedError(f'An EnsembleBoard cannot be drawn. Use an ArrayBoard to animate a simulation.')
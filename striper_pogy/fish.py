@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Set
+from typing import List, Optional, Set
 
 from PIL import ImageDraw
 
@@ -11,16 +11,33 @@ class Fish(ABC):
     """ This class represents an abstract fish.
 
     This class defines properties that are common to all fish.
+    Fish are hashed by identity, so two fish never clash however close they are dropped.
     """
-    def __init__(self, board_size: Size, fish_size: Size):
-        """ Creates a fish and drops it on the board. """
+    default_size: Size
+
+    def __init__(
+            self,
+            board_size: Size,
+            fish_size: Size,
+            location: Optional[Location] = None,
+            rng: Optional[np.random.Generator] = None,
+    ):
+        """ Creates a fish and drops it on the board.
+
+        :param board_size: The (width, height) of the board.
+        :param fish_size: The (width, height) of the fish.
+        :param location: where to drop the fish. A random location is drawn from rng if this is not given.
+        :param rng: the random number generator from which to draw the location. Required if location is not given.
+        """
         if any((f <= 0 for f in fish_size)):
             raise ValueError(f'The width and height of the fish must be positive numbers. Got {fish_size} instead.')
         self.size: Size = fish_size
 
         if any((f <= 0 for f in board_size)):
             raise ValueError(f'The width and height of the board must be positive numbers. Got {board_size} instead.')
-        self.location: Location = self._drop(board_size)
+        if (location is None) and (rng is None):
+            raise ValueError('A fish needs either a location or a random number generator to draw one from.')
+        self.location: Location = self._drop(board_size, rng) if location is None else location
 
         self.children: int = 0
         self.outline: Tuple[int, int, int] = 0, 0, 0
@@ -45,18 +62,35 @@ class Fish(ABC):
     def y(self) -> float:
         return self.location.y
 
+    @classmethod
+    def spawn(
+            cls,
+            n: int,
+            board_size: Size,
+            rng: np.random.Generator,
+            fish_size: Optional[Size] = None,
+    ) -> List['Fish']:
+        """ Creates exactly n fish of this kind, dropped uniformly at random on the board with one bulk draw.
+
+        :param n: number of fish to create.
+        :param board_size: The (width, height) of the board.
+        :param rng: the random number generator from which to draw the locations.
+        :param fish_size: The (width, height) of the fish. Defaults to the default size for this kind of fish.
+        :return: a List of the new fish.
+        """
+        if n < 0:
+            raise ValueError(f'Cannot spawn a negative number of fish. Got {n} instead.')
+        fish_size = cls.default_size if fish_size is None else fish_size
+        xs, ys = sample_locations(rng, n, board_size, fish_size)
+        return [cls(board_size, fish_size, location=Location(x, y)) for x, y in zip(xs, ys)]
+
     @abstractmethod
     def reproduce(self, *args) -> 'Fish':
         pass
 
-    def _drop(self, board_size: Size) -> Location:
-        def sample(margin: float, length: float) -> float:
-            """ Uniform random sample from the board. """
-            return np.random.uniform(low=margin, high=length - margin)
-
-        x: float = sample(self.width / 2, board_size.width)
-        y: float = sample(self.height / 2, board_size.height)
-        return Location(x, y)
+    def _drop(self, board_size: Size, rng: np.random.Generator) -> Location:
+        x, y = sample_locations(rng, 1, board_size, self.size)
+        return Location(x[0], y[0])
 
     def draw(self, draw: ImageDraw, scale: float):
         half_width, half_height = self.width / 2, self.height / 2
@@ -73,25 +107,37 @@ class Prey(Fish):
 
     This class defines properties and methods that are specific to prey.
     """
-    def __init__(self, board_size: Size, fish_size: Size = PREY_SIZE):
+    default_size: Size = PREY_SIZE
+
+    def __init__(
+            self,
+            board_size: Size,
+            fish_size: Size = PREY_SIZE,
+            location: Optional[Location] = None,
+            rng: Optional[np.random.Generator] = None,
+    ):
         """ Creates a Prey fish, drops it on the board, and defines its color. """
-        super().__init__(board_size, fish_size)
+        super().__init__(board_size, fish_size, location, rng)
         self.fill = (0, 0, 255)  # blue
         self.got_eaten = False
 
-    def __hash__(self) -> int:
-        return hash(f'prey {str(self)}')
-
-    def reproduce(self, rate: float = PREY_REPRODUCTION_RATE) -> 'Fish':
+    def reproduce(
+            self,
+            rate: float = PREY_REPRODUCTION_RATE,
+            *,  # any arguments after '*' must be passed by name.
+            coin: float,
+    ) -> 'Fish':
         """ A prey can have one or two children, depending on reproduction rate, if it was not eaten.
 
         :param rate: The reproduction rate to use.
+        :param coin: a uniform random number in [0, 1) that decides the number of children, drawn by the board from its
+                     own Generator, so that every run is reproducible from its seed.
         :return: the modified prey with its number of children.
         """
         if rate < 0:
             raise ValueError(f'Prey reproduction rate must be a non-negative number. Got {rate:.3f} instead.')
 
-        self.children = 0 if self.got_eaten else 1 if np.random.uniform() > rate else 2
+        self.children = 0 if self.got_eaten else 1 if coin > rate else 2
         return self
 
 
@@ -100,15 +146,20 @@ class Predator(Fish):
 
     This class defines properties and methods that are specific to predators.
     """
-    def __init__(self, board_size: Size, fish_size: Size = PREDATOR_SIZE):
+    default_size: Size = PREDATOR_SIZE
+
+    def __init__(
+            self,
+            board_size: Size,
+            fish_size: Size = PREDATOR_SIZE,
+            location: Optional[Location] = None,
+            rng: Optional[np.random.Generator] = None,
+    ):
         """ Creates a Predator fish, drops it on the board, amd defines its color. """
-        super().__init__(board_size, fish_size)
+        super().__init__(board_size, fish_size, location, rng)
         self.fill = (255, 0, 0)  # red
         self.num_eaten: int = 0
 
-    def __hash__(self) -> int:
-        return hash(f'predator {str(self)}')
-
     def touches(self, prey: Prey) -> bool:
         """ Checks to see if this predator touches the given prey.
 
@@ -0,0 +1,148 @@
+from collections import namedtuple
+from typing import List, Optional
+
+import numpy as np
+
+from params import *
+
+# why and when a simulation stopped, with the mean and standard deviation of the population of each species over the
+# window of time steps on which that was decided. A simulation that ran to the end stopped for the reason 'horizon'.
+StopReport = namedtuple('StopReport', 'step reason mean std')
+
+# the reasons for which a simulation may stop early, in the order in which they are tested.
+REASONS: List[str] = ['extinction', 'saturation', 'stationary']
+
+# the ways in which the time steps after an early stop can be filled in.
+FILLS: List[str] = ['repeat', 'mean', 'nan']
+
+
+class Horizon:
+    """ This class decides when a simulation can stop early, because its populations no longer change in distribution.
+
+    Every few steps, the last `window` steps are tested for, in order:
+        - 'extinction': a species had no survivors at any of them, so it was restarted from its starting number every
+          step, and the simulation is stuck in a cycle of extinction and restarting. If only the predators died out,
+          the prey must also be stationary (see below).
+        - 'saturation': the surviving prey would have had more children than the carrying capacity at every one of
+          them, so the number of prey spawned was pinned at the capacity, and the predators are stationary.
+        - 'stationary': neither species is drifting. The window is split into batches, and the means of the batches of
+          its first and second halves are compared with a t statistic, which must stay below `threshold`.
+    Once a test passes, the simulation stops, and the steps after it are filled in as asked by `fill`.
+
+    The tests cannot foresee a rare escape from a state in which a simulation lingers, e.g. prey that hover near
+    extinction for a while before they recover, so such a simulation may be stopped too early. A longer window makes
+    that rarer, at the cost of stopping later.
+
+    The report of every simulation is appended to `reports`, e.g.
+        horizon = Horizon()
+        populations = simulate_once(1, 10_000, horizon=horizon)
+        print(horizon.reports[-1])
+    """
+    def __init__(
+            self,
+            window: int = HORIZON_WINDOW,
+            threshold: float = HORIZON_THRESHOLD,
+            *,  # any arguments after '*' must be passed by name.
+            batches: int = 4,
+            every: int = 8,
+            fill: str = 'repeat',
+    ):
+        """
+        :param window: number of the most recent time steps on which each test is made.
+        :param threshold: largest t statistic between the two halves of the window that counts as stationary.
+        :param batches: number of batches in each half of the window. Averaging over batches of consecutive steps
+                        lessens the correlation between steps, which would otherwise exaggerate the t statistic.
+        :param every: number of time steps between tests.
+        :param fill: how to fill in the steps after an early stop. 'repeat' repeats the window over and over, which
+                     keeps the distribution of the populations. 'mean' uses the mean of each species over the window.
+                     'nan' leaves them as NaN.
+        """
+        if not (batches >= 2):
+            raise ValueError(f'must split each half of the window into at least two batches. Got {batches} instead.')
+        if not (window >= 2 * batches):
+            raise ValueError(f'window must hold at least one step per batch. Got {window} for {batches} batches.')
+        if not (threshold > 0):
+            raise ValueError(f'threshold must be a positive number. Got {threshold} instead.')
+        if not (every >= 1):
+            raise ValueError(f'must test every one or more time steps. Got {every} instead.')
+        if fill not in FILLS:
+            raise ValueError(f'fill must be one of {FILLS}. Got {fill} instead.')
+
+        self.window: int = window
+        self.threshold: float = threshold
+        self.batches: int = batches
+        self.every: int = every
+        self.fill: str = fill
+        self.reports: List[StopReport] = list()
+
+    def _report(self, populations: np.array, step: int, reason: str) -> StopReport:
+        recent = populations[:, step - self.window:step]
+        return StopReport(step, reason, recent.mean(axis=1).tolist(), recent.std(axis=1).tolist())
+
+    def _t_statistic(self, values: np.array) -> float:
+        """ t statistic between the batch means of the first and second halves of the values.
+
+        The spread of the batch means is only measured on the second half, because a transient at the start of the
+        window would inflate the spread of the first half and hide itself.
+        """
+        size = len(values) // (2 * self.batches)
+        first, second = values[len(values) - 2 * self.batches * size:].reshape(2, self.batches, size).mean(axis=2)
+        gap = abs(second.mean() - first.mean())
+        stderr = np.sqrt(2 * second.var(ddof=1) / self.batches)
+        if stderr == 0:
+            return 0. if gap == 0 else np.inf
+        return gap / stderr
+
+    def check(
+            self,
+            populations: np.array,
+            step: int,
+            prey_capacity: int,
+            reproduction_rate: float = PREY_REPRODUCTION_RATE,
+    ) -> Optional[StopReport]:
+        """ Tests whether a simulation can stop after the given number of time steps.
+
+        :param populations: array of shape (2, time steps) of the populations, filled in up to `step`.
+        :param step: number of time steps already simulated.
+        :param prey_capacity: carrying capacity of the prey of the board.
+        :param reproduction_rate: reproduction rate of the prey of the board.
+        :return: the report of the stop, or None if the simulation should go on.
+        """
+        if (step < self.window) or (step % self.every != 0):
+            return None
+        prey, predators = populations[:, step - self.window:step]
+
+        prey_stationary = (not prey.any()) or (self._t_statistic(prey) < self.threshold)
+        if prey_stationary and ((not prey.any()) or (not predators.any())):
+            return self._report(populations, step, 'extinction')
+
+        predators_stationary = self._t_statistic(predators) < self.threshold
+        if predators_stationary and np.all(prey * (1 + reproduction_rate) >= prey_capacity):
+            return self._report(populations, step, 'saturation')
+
+        if predators_stationary and prey_stationary:
+            return self._report(populations, step, 'stationary')
+        return None
+
+    def fast_forward(self, populations: np.array, report: StopReport):
+        """ Fills in the time steps of the populations after an early stop, in place, as asked by `fill`. """
+        remaining = populations.shape[1] - report.step
+        if self.fill == 'repeat':
+            recent = populations[:, report.step - self.window:report.step]
+            populations[:, report.step:] = np.tile(recent, int(np.ceil(remaining / self.window)))[:, :remaining]
+        elif self.fill == 'mean':
+            populations[:, report.step:] = np.array(report.mean)[:, None]
+        else:
+            populations[:, report.step:] = np.nan
+        return
+
+    def finish(self, populations: np.array, report: Optional[StopReport]) -> StopReport:
+        """ Records the report of a simulation, which ran to the end if there is no report of an early stop. """
+        if report is None:
+            step = populations.shape[1]
+            recent = populations[:, max(0, step - self.window):step]
+            report = StopReport(step, 'horizon', recent.mean(axis=1).tolist(), recent.std(axis=1).tolist())
+        else:
+            self.fast_forward(populations, report)
+        self.reports.append(report)
+        return report
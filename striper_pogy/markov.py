@@ -0,0 +1,365 @@
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from board import Board
+from ensemble import EnsembleBoard
+from metrics import NullMetrics
+from params import *
+from utils import TABLES_PATH, Size
+
+# the numbers of prey and predators spawned at the start of a time step. This is all that the agent model carries over
+# from one time step to the next, because every fish is dropped anew.
+Counts = Tuple[int, int]
+
+# version of the way the outcomes of a table are simulated, kept in its settings, so that tables filled in an older
+# way are never mixed with newer ones. Version 2 seeds the outcomes of each Counts from the settings and the Counts.
+TABLE_VERSION: int = 2
+
+# columns of a sampled outcome of one time step.
+SURVIVING_PREY, SURVIVING_PREDATORS, NEXT_PREY, NEXT_PREDATORS = range(4)
+
+
+class TransitionTable:
+    """ This class represents the distribution of the outcome of one time step of the agent model, for each Counts.
+
+    The outcome of a time step is the number of surviving prey and predators, and the Counts of the next time step.
+    For each Counts, the table keeps `samples` outcomes of the exact agent model (an EnsembleBoard), which are only
+    simulated the first time that Counts is asked for. Sampling one of them uniformly at random then follows the
+    empirical distribution of the agent model.
+
+    The outcomes of each Counts are simulated with a generator seeded by the settings and the Counts alone, so an entry
+    is the same whichever board, process or run fills it first, and a simulation gives the same populations for the
+    same seed whether the table was empty or already filled. The generator of a board only picks among the outcomes.
+
+    The table is saved to an .npz file whose name is a hash of the settings of the board and of the model, so a table
+    is only ever reused for the same dynamics. Saving merges with whatever is already in the file, so processes that
+    fill the same table do not erase each other's work.
+    """
+    def __init__(
+            self,
+            size: Size,
+            prey_capacity: int,
+            *,  # any arguments after '*' must be passed by name.
+            starting_prey: int = STARTING_PREY,
+            starting_predators: int = STARTING_PREDATORS,
+            fishery: Optional[float] = FISHERY,
+            reproduction_rate: float = PREY_REPRODUCTION_RATE,
+            food_requirement: float = PREDATOR_FOOD_REQUIREMENTS,
+            samples: int = MARKOV_SAMPLES,
+            path: Optional[str] = None,
+    ):
+        """ Opens the table for the given board, loading whatever was saved before.
+
+        :param size: The (width, height) of the board.
+        :param prey_capacity: carrying capacity of the prey.
+        :param starting_prey: number of prey with which to restart when every prey died.
+        :param starting_predators: number of predators with which to restart when every predator died.
+        :param fishery: fraction of prey to remove each time step dur to fishing.
+        :param reproduction_rate: chance that an uneaten prey has two children instead of one, away from the capacity.
+        :param food_requirement: number of prey that a predator must eat for each of its children.
+        :param samples: number of outcomes of the agent model to keep for each Counts.
+        :param path: file path of the table. Defaults to a file, named after the settings, in TABLES_PATH.
+        """
+        if samples < 1:
+            raise ValueError(f'must keep at least one sample per state. Got {samples} instead.')
+        self.settings: Dict[str, Any] = {
+            'size': list(size),
+            'prey_capacity': prey_capacity,
+            'starting_prey': starting_prey,
+            'starting_predators': starting_predators,
+            'fishery': fishery,
+            'reproduction_rate': reproduction_rate,
+            'food_requirement': food_requirement,
+            'samples': samples,
+            'prey_size': list(PREY_SIZE),
+            'predator_size': list(PREDATOR_SIZE),
+            'version': TABLE_VERSION,
+        }
+        digest = hashlib.sha1(json.dumps(self.settings, sort_keys=True).encode()).hexdigest()[:16]
+        self.digest: str = digest
+        self.path: str = os.path.join(TABLES_PATH, f'table__{digest}.npz') if path is None else path
+        self.size: Size = Size(*size)
+        self.prey_capacity: int = prey_capacity
+        self.starting_prey: int = starting_prey
+        self.starting_predators: int = starting_predators
+        self.fishery: Optional[float] = fishery
+        self.reproduction_rate: float = reproduction_rate
+        self.food_requirement: float = food_requirement
+        self.samples: int = samples
+
+        self._outcomes: Dict[Counts, np.ndarray] = dict()
+        self._unsaved: int = 0
+        self._lock: threading.Lock = threading.Lock()
+        self.hits: int = 0
+        self.misses: int = 0
+        self._merge_file()
+
+    def __len__(self) -> int:
+        return len(self._outcomes)
+
+    def __contains__(self, counts: Counts) -> bool:
+        return tuple(counts) in self._outcomes
+
+    def _merge_file(self):
+        """ Adds the outcomes saved in the file, for the Counts not already in memory. """
+        if not os.path.exists(self.path):
+            return
+        with np.load(self.path) as data:
+            if json.loads(str(data['settings'])) != json.loads(json.dumps(self.settings)):
+                raise ValueError(f'the table at {self.path} was made with different settings.')
+            for counts, outcomes in zip(data['states'].tolist(), data['outcomes']):
+                self._outcomes.setdefault(tuple(counts), outcomes)
+        return
+
+    def save(self):
+        """ Writes the table to its file, keeping the Counts that other processes saved there in the meantime. """
+        with self._lock:
+            self._merge_file()
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            states = sorted(self._outcomes.keys())
+            outcomes = [self._outcomes[s] for s in states]
+            temp_path = f'{self.path}.{os.getpid()}.tmp'
+            with open(temp_path, 'wb') as fp:
+                np.savez(
+                    fp,
+                    settings=np.array(json.dumps(self.settings)),
+                    states=np.array(states, dtype=np.int64).reshape(-1, 2),
+                    outcomes=np.stack(outcomes) if outcomes else np.zeros((0, self.samples, 4), dtype=np.int32),
+                )
+            os.replace(temp_path, self.path)
+            self._unsaved = 0
+        return
+
+    def _seed(self, counts: Counts) -> np.random.SeedSequence:
+        """ The seed from which the outcomes of the given Counts are simulated, decided by the settings alone. """
+        return np.random.SeedSequence(int(self.digest, 16), spawn_key=(int(counts[0]), int(counts[1])))
+
+    def fill(self, states: List[Counts]):
+        """ Simulates `samples` time steps of the agent model from each of the given Counts.
+
+        Each Counts is simulated on its own EnsembleBoard, driven by its own seed (see _seed), so its outcomes do not
+        depend on which other Counts are filled with it.
+
+        :param states: the Counts to fill. Those already in the table are skipped.
+        """
+        states = sorted({tuple(s) for s in states if tuple(s) not in self._outcomes})
+        if not states:
+            return
+        for state in states:
+            board = EnsembleBoard(
+                self.size,
+                self.prey_capacity,
+                num_replicas=self.samples,
+                starting_prey=self.starting_prey,
+                starting_predators=self.starting_predators,
+                fishery=self.fishery,
+                reproduction_rate=self.reproduction_rate,
+                food_requirement=self.food_requirement,
+                rng=np.random.default_rng(self._seed(state)),
+            )
+            survivors = board.step_from(np.full(self.samples, state[0]), np.full(self.samples, state[1]))
+            next_prey, next_predators = board.next_counts()
+            self._outcomes[state] = np.column_stack([survivors, next_prey, next_predators]).astype(np.int32)
+
+        self._unsaved += len(states)
+        if self._unsaved >= MARKOV_SAVE_EVERY:
+            self.save()
+        return
+
+    def outcomes(self, counts: Counts) -> np.ndarray:
+        """ The sampled outcomes for the given Counts, as an array of shape (samples, 4), filled in if needed. """
+        counts = (int(counts[0]), int(counts[1]))
+        if counts in self._outcomes:
+            self.hits += 1
+        else:
+            self.misses += 1
+            self.fill([counts])
+        return self._outcomes[counts]
+
+    def sample(self, counts: Counts, rng: np.random.Generator) -> np.ndarray:
+        """ One outcome of a time step that starts with the given Counts, drawn from the table.
+
+        :return: array of (surviving prey, surviving predators, next prey, next predators).
+        """
+        outcomes = self.outcomes(counts)
+        return outcomes[rng.integers(self.samples)]
+
+    def diagnostics(self) -> Dict[str, Any]:
+        """ How much of the table is filled, how often lookups found it filled, and how precise its entries are.
+
+        The standard error of each entry is that of the mean Counts of the next time step, relative to that mean.
+        """
+        next_counts = [outcomes[:, NEXT_PREY:] for outcomes in self._outcomes.values()]
+        stderr = np.array([
+            c.std(axis=0) / np.sqrt(self.samples) / np.maximum(c.mean(axis=0), 1) for c in next_counts
+        ]).reshape(-1, 2)
+        lookups = self.hits + self.misses
+        return {
+            'states': len(self._outcomes),
+            'samples': self.samples,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.,
+            'mean_relative_stderr': stderr.mean(axis=0).tolist() if len(stderr) else [0., 0.],
+            'max_relative_stderr': stderr.max(axis=0).tolist() if len(stderr) else [0., 0.],
+        }
+
+
+# tables shared by every MarkovBoard in this process, by file path.
+_TABLES: Dict[str, TransitionTable] = dict()
+
+
+def shared_table(size: Size, prey_capacity: int, **kwargs) -> TransitionTable:
+    """ The TransitionTable for the given settings, opened once per process. See TransitionTable. """
+    table = TransitionTable(size, prey_capacity, **kwargs)
+    return _TABLES.setdefault(table.path, table)
+
+
+def save_tables():
+    """ Saves every table of this process with unsaved entries.
+
+    Call it at the end of every task that may fill a table, e.g. each replica run in a worker process, since exit
+    handlers do not reliably run in the workers of a process pool.
+    """
+    [table.save() for table in _TABLES.values() if table._unsaved > 0]
+    return
+
+
+class MarkovBoard(Board):
+    """ A Board that only tracks the Counts, and steps by sampling the outcome from a TransitionTable.
+
+    A time step costs one table lookup, whatever the size of the board, once the table holds the Counts visited.
+    Boards with the same settings share one table, which is filled in as they visit new Counts.
+    There are no fish to draw.
+    """
+    def __init__(
+            self,
+            size: Size,
+            prey_capacity: int,
+            *,  # any arguments after '*' must be passed by name.
+            starting_prey: int = STARTING_PREY,
+            starting_predators: int = STARTING_PREDATORS,
+            fishery: Optional[float] = FISHERY,
+            reproduction_rate: float = PREY_REPRODUCTION_RATE,
+            food_requirement: float = PREDATOR_FOOD_REQUIREMENTS,
+            rng: Optional[np.random.Generator] = None,
+            metrics: Optional[NullMetrics] = None,
+            table: Optional[TransitionTable] = None,
+    ):
+        """ Initializes a board with a given size.
+
+        :param size: The (width, height) of board to use.
+        :param prey_capacity: carrying capacity of the prey.
+        :param starting_prey: number of prey with which to start a simulation.
+        :param starting_predators: number of predators with which to start a simulation.
+        :param fishery: fraction of prey to remove each time step dur to fishing.
+        :param reproduction_rate: chance that an uneaten prey has two children instead of one, away from the capacity.
+        :param food_requirement: number of prey that a predator must eat for each of its children.
+        :param rng: the random number generator that drives the board. A fresh, unseeded one is made if not given.
+        :param metrics: optional StepMetrics that records the time of every step.
+        :param table: the table from which to sample. Defaults to the table shared by boards with the same settings.
+        """
+        super().__init__(
+            size,
+            prey_capacity,
+            starting_prey=starting_prey,
+            starting_predators=starting_predators,
+            fishery=fishery,
+            reproduction_rate=reproduction_rate,
+            food_requirement=food_requirement,
+            rng=rng,
+            metrics=metrics,
+        )
+        if table is None:
+            table = shared_table(
+                size,
+                prey_capacity,
+                starting_prey=starting_prey,
+                starting_predators=starting_predators,
+                fishery=fishery,
+                reproduction_rate=reproduction_rate,
+                food_requirement=food_requirement,
+            )
+        self.table: TransitionTable = table
+        self.counts: Counts = (starting_prey, starting_predators)
+
+    def step(self) -> Tuple[int, int]:
+        """
+        Move the board forward by one time-step.
+
+        :return: numbers of prey and predators that survived the round.
+        """
+        self.metrics.start()
+        outcome = self.table.sample(self.counts, self.rng)
+        self.counts = (int(outcome[NEXT_PREY]), int(outcome[NEXT_PREDATORS]))
+        self.metrics.lap('sample')
+        self.metrics.finish()
+        return int(outcome[SURVIVING_PREY]), int(outcome[SURVIVING_PREDATORS])
+
+    def state(self) -> Dict[str, np.ndarray]:
+        return {'next_prey': np.int64(self.counts[0]), 'next_predators': np.int64(self.counts[1])}
+
+    def load_state(self, state: Dict[str, np.ndarray]):
+        """ Loads a state saved by a MarkovBoard, or the Counts implied by the state of any other board. """
+        if 'next_prey' in state:
+            self.counts = (int(state['next_prey']), int(state['next_predators']))
+            return
+        next_prey = min(int(np.sum(state['prey_children'])), self.prey_capacity) or self.starting_prey
+        next_predators = int(np.sum(state['predator_children'])) or self.starting_predators
+        self.counts = (next_prey, next_predators)
+        return
+
+    def draw(self, resolution: int = 2 ** 12):
+        raise NotImplementedError(f'A MarkovBoard has no fish to draw. Use an ArrayBoard to animate a simulation.')
+
+
+def validate(
+        size_multiplier: int,
+        time_steps: int,
+        num_replicas: int,
+        rng: Optional[np.random.Generator] = None,
+) -> Dict[str, Any]:
+    """ Compares trajectories sampled from the shared table with trajectories of the exact agent model.
+
+    :param size_multiplier: size multiplier of board and capacity.
+    :param time_steps: number of time steps for which to run each trajectory.
+    :param num_replicas: number of trajectories of each kind.
+    :param rng: the random number generator that drives both kinds of trajectories.
+    :return: for each species, the largest gap between the mean populations over time (in units of the standard error
+             of that gap), and the Kolmogorov-Smirnov statistic and p-value of the populations pooled over time and
+             of those at the last time step, followed by the diagnostics of the table.
+    """
+    # scipy is only needed to validate a table, so running the markov engine does not need it.
+    from scipy.stats import ks_2samp
+
+    rng = np.random.default_rng() if rng is None else rng
+    size = Size(BOARD_SIZE.width * size_multiplier, BOARD_SIZE.height * size_multiplier)
+    prey_capacity = PREY_CAPACITY * (size_multiplier ** 2)
+
+    agents = EnsembleBoard(size, prey_capacity, num_replicas=num_replicas, rng=rng)
+    exact = np.stack([agents.step() for _ in range(time_steps)], axis=2)  # (replicas, 2, time)
+
+    boards = [MarkovBoard(size, prey_capacity, rng=rng) for _ in range(num_replicas)]
+    surrogate = np.array([[board.step() for _ in range(time_steps)] for board in boards]).transpose(0, 2, 1)
+
+    report: Dict[str, Any] = dict()
+    for species, name in enumerate(['prey', 'predators']):
+        a, b = exact[:, species, :], surrogate[:, species, :]
+        gap_stderr = np.sqrt((a.var(axis=0) + b.var(axis=0)) / num_replicas)
+        gap = np.abs(a.mean(axis=0) - b.mean(axis=0)) / np.maximum(gap_stderr, 1e-12)
+        pooled, last = ks_2samp(a.ravel(), b.ravel()), ks_2samp(a[:, -1], b[:, -1])
+        report[name] = {
+            'max_mean_gap_in_stderr': float(gap.max()),
+            'pooled_ks_statistic': float(pooled.statistic),
+            'pooled_ks_pvalue': float(pooled.pvalue),
+            'last_step_ks_statistic': float(last.statistic),
+            'last_step_ks_pvalue': float(last.pvalue),
+        }
+    report['table'] = boards[0].table.diagnostics()
+    save_tables()
+    return report
@@ -0,0 +1,107 @@
+import json
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+# a record of one time step: the step number, the seconds spent in each phase and the counters of the step.
+StepRecord = Dict[str, Any]
+
+
+class NullMetrics:
+    """ Metrics that record nothing. Boards use it when no metrics are asked for, so each hook is a no-op call. """
+    enabled: bool = False
+
+    def start(self):
+        pass
+
+    def lap(self, phase: str):
+        pass
+
+    def count(self, counter: str, value: int):
+        pass
+
+    def finish(self):
+        pass
+
+
+class StepMetrics(NullMetrics):
+    """ This class records the wall time of each phase of Board.step and counters of what happened in it.
+
+    The board calls `start` when a step begins, `lap` at the end of each phase, and `count` for each counter.
+    `finish` closes the step: its record is added to the running totals and passed to every sink.
+
+    e.g.
+        metrics = StepMetrics(sinks=[JsonLinesSink('steps.jsonl')])
+        board = ArrayBoard(size, prey_capacity, metrics=metrics)
+        [board.step() for _ in range(100)]
+        print(metrics.summary())
+    """
+    enabled: bool = True
+
+    def __init__(self, sinks: Optional[List[Callable[[StepRecord], None]]] = None):
+        """
+        :param sinks: functions called with the record of every step, as soon as the step finishes.
+        """
+        self.sinks: List[Callable[[StepRecord], None]] = list(sinks or list())
+        self.num_steps: int = 0
+        self.times: Dict[str, float] = dict()
+        self.counts: Dict[str, int] = dict()
+
+        self._last: float = 0.
+        self._step_times: Dict[str, float] = dict()
+        self._step_counts: Dict[str, int] = dict()
+
+    def start(self):
+        self._step_times, self._step_counts = dict(), dict()
+        self._last = time.perf_counter()
+        return
+
+    def lap(self, phase: str):
+        """ Ends the given phase, which is charged the time since the previous lap (or the start of the step). """
+        now = time.perf_counter()
+        self._step_times[phase] = self._step_times.get(phase, 0.) + now - self._last
+        self._last = now
+        return
+
+    def count(self, counter: str, value: int):
+        self._step_counts[counter] = self._step_counts.get(counter, 0) + int(value)
+        return
+
+    def finish(self):
+        for phase, seconds in self._step_times.items():
+            self.times[phase] = self.times.get(phase, 0.) + seconds
+        for counter, value in self._step_counts.items():
+            self.counts[counter] = self.counts.get(counter, 0) + value
+
+        record: StepRecord = {'step': self.num_steps, 'times': self._step_times, 'counts': self._step_counts}
+        self.num_steps += 1
+        [sink(record) for sink in self.sinks]
+        return
+
+    def summary(self) -> Dict[str, Any]:
+        """ Totals over every step so far, with the share of the time taken by each phase. """
+        total = sum(self.times.values())
+        return {
+            'steps': self.num_steps,
+            'seconds': total,
+            'times': dict(self.times),
+            'shares': {phase: seconds / total if total > 0 else 0. for phase, seconds in self.times.items()},
+            'counts': dict(self.counts),
+        }
+
+
+class JsonLinesSink:
+    """ A sink for StepMetrics that appends the record of every step, as one line of JSON, to a file. """
+    def __init__(self, path: str):
+        self._fp = open(path, 'a')
+
+    def __call__(self, record: StepRecord):
+        self._fp.write(json.dumps(record) + '\n')
+        return
+
+    def close(self):
+        self._fp.close()
+        return
+
+
+# shared by every board that is not given metrics.
+NULL_METRICS: NullMetrics = NullMetrics()
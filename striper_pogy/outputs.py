@@ -0,0 +1,111 @@
+import json
+import os
+import threading
+from typing import Any, Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows, where the manifest is only protected within a process.
+    fcntl = None
+
+# name of the file, in the root of a tree, that lists the artifacts of every run.
+MANIFEST_FILENAME: str = 'manifest.jsonl'
+
+
+class RunDirectory:
+    """ This class represents the directory that holds the artifacts (plots, animation) of one run.
+
+    Paths are handed out with `artifact`, which also lists the artifact in the manifest of the tree.
+    """
+    def __init__(self, tree: 'OutputTree', number: int, path: str):
+        self.tree: 'OutputTree' = tree
+        self.number: int = number
+        self.path: str = path
+
+    def artifact(self, filename: str, kind: Optional[str] = None) -> str:
+        """ The path at which to save an artifact of the run.
+
+        :param filename: name of the file inside the run directory.
+        :param kind: what the artifact is, e.g. 'phase' or 'gif'. Defaults to the filename.
+        :return: the path at which to save the artifact.
+        """
+        path = os.path.join(self.path, filename)
+        self.tree.record({'run': self.number, 'kind': kind or filename, 'path': os.path.relpath(path, self.tree.root)})
+        return path
+
+
+class OutputTree:
+    """ This class hands out numbered run directories, 'sim__{number}__', under one root directory.
+
+    Each run directory is claimed by creating it with os.mkdir, which fails if another process got there first, so
+    several processes can allocate runs in the same tree without ever sharing a directory. Each process remembers the
+    next free number, so it only ever probes past the runs that other processes claimed since.
+
+    Every artifact is listed, as one line of JSON, in a manifest at the root of the tree. Lines are appended under a
+    file lock, so the manifest stays readable with many writers.
+    """
+    def __init__(self, root: str):
+        """ Opens the tree in the given directory, creating the directory if needed.
+
+        :param root: directory that holds the run directories and the manifest.
+        """
+        os.makedirs(root, exist_ok=True)
+        self.root: str = root
+        self._next: Optional[int] = None
+        self._lock: threading.Lock = threading.Lock()
+
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self.root, MANIFEST_FILENAME)
+
+    def _first_guess(self) -> int:
+        """ One past the largest run in the manifest, or 0 for a new tree. Only read once per process. """
+        runs = [entry['run'] for entry in self.manifest() if entry.get('kind') == 'run']
+        return max(runs, default=-1) + 1
+
+    def new_run(self) -> RunDirectory:
+        """ Claims the next free run directory.
+
+        :return: the newly created, empty run directory.
+        """
+        with self._lock:
+            if self._next is None:
+                self._next = self._first_guess()
+            while True:
+                number = self._next
+                self._next += 1
+                path = os.path.join(self.root, f'sim__{number}__')
+                try:
+                    os.mkdir(path)
+                    break
+                except FileExistsError:
+                    continue
+        self.record({'run': number, 'kind': 'run', 'path': os.path.relpath(path, self.root)})
+        return RunDirectory(self, number, path)
+
+    def record(self, entry: Dict[str, Any]):
+        """ Appends one entry to the manifest. """
+        line = json.dumps(entry) + '\n'
+        with self._lock, open(self.manifest_path, 'a') as fp:
+            if fcntl is not None:
+                fcntl.flock(fp, fcntl.LOCK_EX)
+            fp.write(line)
+            fp.flush()
+            if fcntl is not None:
+                fcntl.flock(fp, fcntl.LOCK_UN)
+        return
+
+    def manifest(self) -> List[Dict[str, Any]]:
+        """ Every entry in the manifest, in the order in which they were recorded. """
+        if not os.path.exists(self.manifest_path):
+            return list()
+        with open(self.manifest_path) as fp:
+            return [json.loads(line) for line in fp if line.endswith('\n')]
+
+    def artifacts(self, number: int) -> Dict[str, str]:
+        """ The artifacts of a run, as a dictionary from the kind of each artifact to its path. """
+        return {
+            entry['kind']: os.path.join(self.root, entry['path'])
+            for entry in self.manifest()
+            if entry['run'] == number and entry['kind'] != 'run'
+        }
@@ -18,14 +18,48 @@ PREDATOR_FOOD_REQUIREMENTS = 3
 # fraction of Menhaden to remove by fishing each round
 FISHERY = None
 
+# which population engine to use: 'objects' keeps one Fish per fish, 'arrays' keeps each species as NumPy arrays,
+# 'markov' samples the outcome of each step from a table filled in by the 'arrays' engine.
+ENGINE = 'objects'
+
+# number of outcomes of the agent model kept for each state of the 'markov' engine. See markov.py.
+MARKOV_SAMPLES = 256
+
+# number of newly filled states after which the table of the 'markov' engine is saved.
+MARKOV_SAVE_EVERY = 32
+
+# whether to advance all the simulations together on one EnsembleBoard. Simulations are not animated in this mode.
+ENSEMBLE = False
+
+# number of worker processes over which runner.py spreads the simulations. None uses every core.
+WORKERS = None
+
+# minimum number of seconds between checkpoints of a simulation that is given a checkpoint path
+CHECKPOINT_INTERVAL = 60.
+
+# number of the most recent time steps on which a Horizon tests whether a simulation can stop early. See horizon.py.
+HORIZON_WINDOW = 128
+
+# largest t statistic between the two halves of that window for which a Horizon counts the populations as stationary.
+HORIZON_THRESHOLD = 2.
+
 # Number of times to run the simulation
 NUM_SIMULATIONS = 10
 
 # number of time steps for which to run each simulation
 TIME_STEPS = 100
 
+# whether to append the populations of every simulation to the results store. See results.py.
+SAVE_RESULTS = True
+
 # whether to erase old plots before generating new ones when rerunning code
 ERASE = True
 
 # whether to use the first simulation to create an animation of the model
 ANIMATE = True
+
+# keep only every k-th time step in the animation
+ANIMATION_EVERY = 1
+
+# length, in pixels, of the longer side of each frame of the animation
+ANIMATION_RESOLUTION = 2 ** 12
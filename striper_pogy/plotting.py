@@ -0,0 +1,98 @@
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Tuple
+
+import matplotlib
+import numpy as np
+from matplotlib.axes import Axes
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from PIL import Image
+
+# render off-screen, in case anything loads pyplot later. The figures here draw on FigureCanvasAgg directly.
+matplotlib.use('Agg')
+
+# number of background threads that encode and save PNGs.
+ENCODER_WORKERS: int = 2
+
+# padding, in inches, kept around the tight bounding box of a saved figure.
+PAD_INCHES: float = 0.25
+
+
+class PlotWriter:
+    """ Saves figures as PNGs without making the caller wait for the encoding.
+
+    The figure is rendered to pixels on the calling thread, because matplotlib figures are not thread-safe.
+    The pixels are then cropped to the tight bounding box and handed to a pool of threads that encode and save them.
+    """
+    def __init__(self, workers: int = ENCODER_WORKERS):
+        self._executor: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='png')
+        self._pending: List[Future] = list()
+        self._lock: threading.Lock = threading.Lock()
+
+    @staticmethod
+    def _encode(pixels: np.ndarray, path: str):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        Image.fromarray(pixels).save(path)
+        return
+
+    def save(self, fig: Figure, path: str, pad_inches: float = PAD_INCHES) -> Future:
+        """ Renders the figure now and saves it to the path in the background.
+
+        :param fig: the figure to save.
+        :param path: file path of the PNG.
+        :param pad_inches: padding, in inches, kept around the tight bounding box of the figure.
+        :return: a Future that finishes when the file is written.
+        """
+        fig.canvas.draw()
+        pixels = np.asarray(fig.canvas.buffer_rgba())
+
+        # crop to the tight bounding box, like savefig(bbox_inches='tight'). Pixel rows count down from the top.
+        bbox = fig.get_tightbbox(fig.canvas.get_renderer()).padded(pad_inches)
+        height = pixels.shape[0]
+        x0, x1 = max(0, int(bbox.x0 * fig.dpi)), min(pixels.shape[1], int(np.ceil(bbox.x1 * fig.dpi)))
+        y0, y1 = max(0, height - int(np.ceil(bbox.y1 * fig.dpi))), min(height, height - int(bbox.y0 * fig.dpi))
+        pixels = pixels[y0:y1, x0:x1, :3].copy()
+
+        future = self._executor.submit(self._encode, pixels, path)
+        with self._lock:
+            self._pending = [f for f in self._pending if not f.done()]
+            self._pending.append(future)
+        return future
+
+    def wait(self):
+        """ Blocks until every PNG handed to the writer has been saved, re-raising the first error, if any. """
+        with self._lock:
+            pending, self._pending = self._pending, list()
+        [future.result() for future in pending]
+        return
+
+
+class FigureCache:
+    """ Keeps one Agg figure per kind of plot so that it is created once and then updated in place.
+
+    The artists drawn on each figure are kept in `artists`, under the same key, so that they can be updated too.
+    """
+    def __init__(self):
+        self._figures: Dict[str, Tuple[Figure, Axes]] = dict()
+        self.artists: Dict[str, object] = dict()
+
+    def get(self, key: str, figsize: Tuple[float, float] = (16, 10), dpi: int = 200) -> Tuple[Figure, Axes]:
+        """ The figure and axes for the given kind of plot, created the first time they are asked for.
+
+        :param key: name of the kind of plot.
+        :param figsize: size of the figure in inches.
+        :param dpi: resolution of the figure.
+        :return: the figure and its only axes.
+        """
+        if key not in self._figures:
+            fig = Figure(figsize=figsize, dpi=dpi)
+            FigureCanvasAgg(fig)
+            self._figures[key] = fig, fig.add_subplot(111)
+        return self._figures[key]
+
+
+# shared by all the plotting helpers.
+WRITER: PlotWriter = PlotWriter()
+FIGURES: FigureCache = FigureCache()
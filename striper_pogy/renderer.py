@@ -0,0 +1,176 @@
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from PIL import Image, ImageDraw, ImageFont
+
+from utils import Size
+
+# color of the fish that died.
+DEAD_FILL: Tuple[int, int, int] = (211, 211, 211)
+
+# color of the survivor counts.
+TEXT_FILL: Tuple[int, int, int] = (0, 255, 0)
+
+# number of blends of the text color into the white background used for anti-aliased text.
+TEXT_LEVELS: int = 8
+
+# colors used by Board.draw, followed by the blends of the text color into the white background.
+PALETTE: List[Tuple[int, int, int]] = [
+    (255, 255, 255),  # background
+    (0, 0, 0),  # outlines
+    (0, 0, 255),  # living prey
+    (255, 0, 0),  # living predators
+    DEAD_FILL,
+    *[
+        tuple(255 + (c - 255) * level // TEXT_LEVELS for c in TEXT_FILL)
+        for level in range(1, TEXT_LEVELS + 1)
+    ],
+]
+
+# the fish of one species: x-coordinates, y-coordinates, which fish are alive, fish size, fill and outline colors.
+Species = Tuple[np.ndarray, np.ndarray, np.ndarray, Size, Tuple[int, int, int], Tuple[int, int, int]]
+
+
+@lru_cache(maxsize=None)
+def _font(size: int) -> ImageFont:
+    """ Loads the font for the survivor counts once per size, falling back to the default font if arial is missing. """
+    try:
+        return ImageFont.truetype(font='./arial.ttf', size=size)
+    except OSError:
+        return ImageFont.load_default()
+
+
+@lru_cache(maxsize=256)
+def _text_levels(text: str, size: int) -> np.ndarray:
+    """ Renders the text once into an array of anti-aliasing levels, from 0 (background) to TEXT_LEVELS (text). """
+    font = _font(size)
+    _, _, right, bottom = ImageDraw.Draw(Image.new(mode='L', size=(1, 1))).multiline_textbbox((0, 0), text, font=font)
+    mask = Image.new(mode='L', size=(max(1, right), max(1, bottom)), color=0)
+    ImageDraw.Draw(mask).multiline_text((0, 0), text, fill=255, font=font)
+    return (np.asarray(mask, dtype=np.uint16) * TEXT_LEVELS + 127) // 255
+
+
+class Renderer:
+    """ Paints frames of the board into a reused buffer of palette indices.
+
+    Every run of consecutive fish that share a stamp is painted with a single vectorized write through a sliding-window
+    view of the buffer, so the cost of a frame depends on the area covered by fish rather than on the number of Python
+    calls, and the fish still overlap in the order in which they are drawn.
+    Frames are palette ('P' mode) images, which take a third of the memory of RGB frames and encode to GIF directly.
+    """
+    def __init__(self):
+        self.palette: List[Tuple[int, int, int]] = list(PALETTE)
+        self._buffer: Optional[np.ndarray] = None
+        self._canvas: Optional[np.ndarray] = None
+        self._margin: int = 0
+
+    def _index(self, color: Tuple[int, int, int]) -> int:
+        """ Palette index of the color, which is added to the palette if it is not already there. """
+        color = tuple(color)
+        if color not in self.palette:
+            if len(self.palette) == 256:
+                raise ValueError(f'The palette is full. Cannot add color {color}.')
+            self.palette.append(color)
+        return self.palette.index(color)
+
+    def _reset(self, width: int, height: int, margin: int) -> np.ndarray:
+        """ Returns the canvas, painted with the background color, inside a margin of at least the given width.
+
+        The margin is wider than any stamp, so stamps that hang off the edges of the frame are cropped, as by
+        ImageDraw, rather than moved inside it. The buffer is only reallocated if it no longer fits.
+        """
+        if (self._canvas is None) or (self._canvas.shape != (height, width)) or (self._margin < margin):
+            self._margin = margin
+            self._buffer = np.empty(shape=(height + 2 * margin, width + 2 * margin), dtype=np.uint8)
+        self._buffer[:] = 0
+        self._canvas = self._buffer[self._margin:self._margin + height, self._margin:self._margin + width]
+        return self._canvas
+
+    def _stamp(self, x1: np.ndarray, y1: np.ndarray, stamp: np.ndarray):
+        """ Copies the stamp onto the canvas with its top-left corner at each of the given pixels, in order. """
+        if x1.shape[0] == 0:
+            return
+        buffer_height, buffer_width = self._buffer.shape
+        height, width = stamp.shape
+        # every window of the view is one stamp-sized rectangle of the buffer, indexed by its top-left pixel. Stamps
+        # that lie wholly outside the frame are clipped onto the margin, where they are never seen.
+        windows = sliding_window_view(self._buffer, (height, width), writeable=True)
+        rows = np.clip(y1 + self._margin, 0, buffer_height - height)
+        columns = np.clip(x1 + self._margin, 0, buffer_width - width)
+        windows[rows, columns] = stamp
+        return
+
+    def _paint_rectangles(
+            self,
+            x: np.ndarray,
+            y: np.ndarray,
+            alive: np.ndarray,
+            size: Size,
+            scale: float,
+            fill: Tuple[int, int, int],
+            outline: Tuple[int, int, int],
+    ):
+        """ Paints the fish centered at (x, y) as outlined rectangles, in order, exactly like ImageDraw.rectangle.
+
+        ImageDraw truncates the corners of a rectangle to whole pixels, so the size of a rectangle in pixels depends on
+        where it is. Consecutive fish with the same size and state are stamped together, which keeps the order in which
+        they overlap.
+        """
+        x1 = np.trunc((x - size.width / 2) * scale).astype(np.int64)
+        y1 = np.trunc((y - size.height / 2) * scale).astype(np.int64)
+        widths = np.trunc((x + size.width / 2) * scale).astype(np.int64) - x1 + 1
+        heights = np.trunc((y + size.height / 2) * scale).astype(np.int64) - y1 + 1
+        keys = np.stack([heights, widths, alive], axis=1)
+        # the first fish of every run of consecutive fish with the same stamp.
+        starts = np.flatnonzero(np.concatenate([[True], np.any(keys[1:] != keys[:-1], axis=1)]))
+        for start, stop in zip(starts, np.append(starts[1:], len(keys))):
+            height, width, is_alive = keys[start]
+            stamp = np.full(shape=(height, width), fill_value=self._index(outline), dtype=np.uint8)
+            stamp[1:-1, 1:-1] = self._index(fill if is_alive else DEAD_FILL)
+            self._stamp(x1[start:stop], y1[start:stop], stamp)
+        return
+
+    def _write_text(self, xy: Tuple[int, int], text: str, size: int):
+        levels = _text_levels(text, size)
+        left, top = xy
+        bottom = min(self._canvas.shape[0], top + levels.shape[0])
+        right = min(self._canvas.shape[1], left + levels.shape[1])
+        if bottom <= top or right <= left:
+            return
+        levels = levels[:bottom - top, :right - left]
+        region = self._canvas[top:bottom, left:right]
+        # the blends of the text color follow the fixed colors at the start of the palette.
+        region[levels > 0] = (len(PALETTE) - TEXT_LEVELS - 1 + levels[levels > 0]).astype(np.uint8)
+        return
+
+    def draw(
+            self,
+            image_size: Tuple[int, int],
+            scale: float,
+            species: List[Species],
+            text: str,
+            text_xy: Tuple[int, int],
+            text_size: int,
+    ) -> Image:
+        """ Draws one frame.
+
+        :param image_size: The (width, height) of the frame in pixels.
+        :param scale: number of pixels per unit of length on the board.
+        :param species: the fish to draw, one entry per species, in drawing order.
+        :param text: text to write, in TEXT_FILL, on top of the fish.
+        :param text_xy: pixel of the top-left corner of the text.
+        :param text_size: font size of the text.
+        :return: the drawn frame, as a palette image.
+        """
+        # the widest stamp, plus one pixel for the truncation of its corners.
+        margin = max([int(max(size) * scale) + 2 for _, _, _, size, _, _ in species], default=0)
+        self._reset(*image_size, margin)
+        for x, y, alive, size, fill, outline in species:
+            self._paint_rectangles(x, y, alive, size, scale, fill, outline)
+        self._write_text(text_xy, text, text_size)
+
+        im: Image = Image.frombytes(mode='P', size=image_size, data=np.ascontiguousarray(self._canvas).tobytes())
+        im.putpalette([c for color in self.palette for c in color])
+        return im
@@ -0,0 +1,164 @@
+import json
+import os
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+import params
+from utils import RESULTS_PATH
+
+# name of the file, in the root of a store, that holds one line of metadata per run.
+INDEX_FILENAME: str = 'index.jsonl'
+
+# names of the parameters of the model that are recorded with every run.
+MODEL_PARAMS: List[str] = [
+    'BOARD_SIZE',
+    'PREY_SIZE',
+    'PREY_CAPACITY',
+    'PREY_REPRODUCTION_RATE',
+    'STARTING_PREY',
+    'PREDATOR_SIZE',
+    'STARTING_PREDATORS',
+    'PREDATOR_FOOD_REQUIREMENTS',
+    'FISHERY',
+]
+
+
+def model_params() -> Dict[str, Any]:
+    """ The current values of the parameters of the model, as plain JSON-friendly values. """
+    return {name: getattr(params, name) for name in MODEL_PARAMS}
+
+
+class ResultsStore:
+    """ This class represents an append-only store of the population time series of many simulations.
+
+    Each call to append writes one shard: a .npy file of shape (num_runs, 2, time_steps), whose rows hold the prey and
+    predator populations of each run. The metadata of every run (size multiplier, engine, seeds, parameters of the
+    model, and where its populations live) is appended as one line of JSON to the index.
+
+    Shards are opened as read-only memory maps the first time they are read, so the populations of a run are a view
+    into the file, and only the pages that are actually used are ever read from disk.
+    """
+    def __init__(self, root: str = RESULTS_PATH):
+        """ Opens the store in the given directory, creating the directory if needed.
+
+        :param root: directory that holds the shards and the index.
+        """
+        os.makedirs(root, exist_ok=True)
+        self.root: str = root
+        self._records: Optional[List[Dict[str, Any]]] = None
+        self._shards: Dict[str, np.ndarray] = dict()
+        self._lock: threading.Lock = threading.Lock()
+
+    @property
+    def index_path(self) -> str:
+        return os.path.join(self.root, INDEX_FILENAME)
+
+    @property
+    def records(self) -> List[Dict[str, Any]]:
+        """ Metadata of every run in the store, in the order in which they were appended. Runs are numbered by their
+        position in this list. """
+        if self._records is None:
+            self.refresh()
+        return self._records
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def refresh(self):
+        """ Re-reads the index, to pick up runs appended by other processes. """
+        records: List[Dict[str, Any]] = list()
+        if os.path.exists(self.index_path):
+            with open(self.index_path) as fp:
+                # a line that was cut short by a crash is ignored. Its shard is never read.
+                records = [json.loads(line) for line in fp if line.endswith('\n')]
+        self._records = records
+        return
+
+    def _new_shard(self) -> Tuple[str, Any]:
+        """ Creates an empty shard file with a name that no other writer has taken, and returns its name and handle. """
+        number = len({record['shard'] for record in self.records})
+        while True:
+            name = f'shard__{number:05d}.npy'
+            try:
+                return name, open(os.path.join(self.root, name), 'xb')
+            except FileExistsError:
+                number += 1
+
+    def append(self, populations: np.ndarray, records: List[Dict[str, Any]]) -> List[int]:
+        """ Writes the populations of some runs to a new shard and adds their metadata to the index.
+
+        :param populations: array of shape (num_runs, 2, time_steps) with the prey and predator populations of each run.
+        :param records: metadata of each run, such as its size multiplier, engine and seed. Must be JSON-serializable.
+        :return: the numbers of the appended runs.
+        """
+        populations = np.asarray(populations)
+        if (populations.ndim != 3) or (populations.shape[1] != 2):
+            raise ValueError(f'populations must have shape (num_runs, 2, time_steps). Got {populations.shape} instead.')
+        if len(records) != populations.shape[0]:
+            raise ValueError(f'need one record per run. Got {len(records)} records for {populations.shape[0]} runs.')
+
+        with self._lock:
+            name, fp = self._new_shard()
+            with fp:
+                np.save(fp, np.ascontiguousarray(populations))
+
+            # the shard is complete before it is indexed, so readers never see a partial shard.
+            lines = [
+                json.dumps({
+                    **record,
+                    'shard': name,
+                    'row': row,
+                    'time_steps': populations.shape[2],
+                })
+                for row, record in enumerate(records)
+            ]
+            with open(self.index_path, 'a') as fp:
+                fp.write(''.join(line + '\n' for line in lines))
+
+            first = len(self.records)
+            self._records.extend(json.loads(line) for line in lines)
+        return list(range(first, first + len(records)))
+
+    def shard(self, name: str) -> np.ndarray:
+        """ The whole shard with the given name, as a read-only memory map. """
+        if name not in self._shards:
+            self._shards[name] = np.load(os.path.join(self.root, name), mmap_mode='r')
+        return self._shards[name]
+
+    def populations(self, run: int) -> np.ndarray:
+        """ The populations of a run, as a read-only view of shape (2, time_steps) into its shard.
+
+        :param run: number of the run.
+        :return: the prey populations in row 0 and the predator populations in row 1.
+        """
+        record = self.records[run]
+        return self.shard(record['shard'])[record['row']]
+
+    def select(self, **criteria) -> List[int]:
+        """ The numbers of the runs whose metadata match every given criterion, e.g. select(size_multiplier=2).
+
+        Criteria on the parameters of the model are matched against the recorded parameters, e.g. select(FISHERY=None).
+        """
+        def value_of(record: Dict[str, Any], key: str):
+            return record[key] if key in record else record.get('params', dict()).get(key)
+
+        # tuples, such as sizes, are stored as lists in the index.
+        criteria = {key: list(value) if isinstance(value, tuple) else value for key, value in criteria.items()}
+        matches = lambda record: all(value_of(record, key) == value for key, value in criteria.items())
+        return [run for run, record in enumerate(self.records) if matches(record)]
+
+    def shards(self) -> Iterator[Tuple[List[int], np.ndarray]]:
+        """ Iterates over the shards, yielding the numbers of the runs in each shard and the shard as a memory map.
+
+        This is the cheapest way to analyse every run, because each shard is read in one sequential sweep.
+        """
+        runs_by_shard: Dict[str, List[int]] = dict()
+        for run, record in enumerate(self.records):
+            runs_by_shard.setdefault(record['shard'], list()).append(run)
+        for name, runs in runs_by_shard.items():
+            shard = self.shard(name)
+            rows = [self.records[run]['row'] for run in runs]
+            # a shard is only copied if some of its rows are missing from the index.
+            yield runs, shard if rows == list(range(shard.shape[0])) else shard[rows]
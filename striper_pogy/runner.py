@@ -0,0 +1,175 @@
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, Future, FIRST_COMPLETED, wait
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from params import *
+from markov import save_tables
+from plotting import WRITER
+from results import ResultsStore, model_params
+from simulate import draw_plots, prepare_plots_dir, simulate_once
+
+
+def replica_seeds(
+        seed: int,
+        size_multipliers: List[int],
+        num_simulations: int,
+) -> Dict[Tuple[int, int], np.random.SeedSequence]:
+    """ Spawns an independent SeedSequence for every (size_multiplier, replica) pair.
+
+    The streams only depend on the root seed and on the position of the pair in the sweep,
+    never on which process runs the replica or in what order.
+
+    :param seed: root seed for the whole sweep.
+    :param size_multipliers: the size multipliers in the sweep.
+    :param num_simulations: number of replicas for each size multiplier.
+    :return: dictionary from (size_multiplier, replica) to its SeedSequence.
+    """
+    root = np.random.SeedSequence(seed)
+    seeds: Dict[Tuple[int, int], np.random.SeedSequence] = dict()
+    for size_multiplier, child in zip(size_multipliers, root.spawn(len(size_multipliers))):
+        for replica, grandchild in enumerate(child.spawn(num_simulations)):
+            seeds[(size_multiplier, replica)] = grandchild
+    return seeds
+
+
+def _run_replica(
+        size_multiplier: int,
+        time_steps: int,
+        engine: str,
+        seed: np.random.SeedSequence,
+        checkpoint_path: Optional[str] = None,
+) -> np.array:
+    """ Runs one simulation in a worker process, with a Generator seeded from its own SeedSequence.
+    The tables of the 'markov' engine are saved before the task ends, since exit handlers may never run in a worker.
+    """
+    rng = np.random.default_rng(seed)
+    try:
+        return simulate_once(
+            size_multiplier,
+            time_steps,
+            gif_path=None,
+            engine=engine,
+            verbose=False,
+            rng=rng,
+            checkpoint_path=checkpoint_path,
+        )
+    finally:
+        save_tables()
+
+
+def run_simulations(
+        size_multipliers: List[int],
+        *,  # any arguments after '*' must be passed by name.
+        num_simulations: int = NUM_SIMULATIONS,
+        time_steps: int = TIME_STEPS,
+        engine: str = ENGINE,
+        seed: int = 0,
+        workers: Optional[int] = WORKERS,
+        progress: Optional[Callable[[int, int], None]] = None,
+        cancel: Optional[threading.Event] = None,
+        checkpoint_dir: Optional[str] = None,
+) -> Dict[int, np.array]:
+    """
+    Runs every replica for every size multiplier, spread over a pool of processes.
+
+    The results are bit-identical for any number of workers because each replica draws from its own seed stream.
+
+    :param size_multipliers: the size multipliers for which to run simulations.
+    :param num_simulations: number of replicas for each size multiplier.
+    :param time_steps: Number of time steps for which to run each replica.
+    :param engine: name of the population engine to use. See simulate.ENGINES.
+    :param seed: root seed for the whole sweep.
+    :param workers: number of worker processes. None uses every core.
+    :param progress: optional callback, called with (number finished, total number) after each replica finishes.
+    :param cancel: optional event. When it is set, replicas that have not started are cancelled and the runner stops.
+    :param checkpoint_dir: optional directory in which every replica is checkpointed as it runs. Rerunning the same
+                           sweep resumes each unfinished replica from its checkpoint. See simulate_once.
+    :return: dictionary from size multiplier to an array of shape (num_simulations, 2, time_steps).
+    """
+    if any(((not isinstance(m, int)) or (m < 1) for m in size_multipliers)):
+        raise ValueError(f'The Size Multipliers must be integers, and be at least 1. Got {size_multipliers} instead.')
+    if num_simulations < 1:
+        raise ValueError(f'must run at least one simulation. Got {num_simulations}')
+
+    seeds = replica_seeds(seed, size_multipliers, num_simulations)
+    if checkpoint_dir is not None:
+        os.makedirs(checkpoint_dir, exist_ok=True)
+    results: Dict[int, np.array] = {m: np.zeros(shape=(num_simulations, 2, time_steps)) for m in size_multipliers}
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending: Dict[Future, Tuple[int, int]] = {
+            executor.submit(
+                _run_replica, m, time_steps, engine, s,
+                None if checkpoint_dir is None else os.path.join(checkpoint_dir, f'seed_{seed}__m_{m}__r_{r}.npz'),
+            ): (m, r)
+            for (m, r), s in seeds.items()
+        }
+        try:
+            while pending:
+                if (cancel is not None) and cancel.is_set():
+                    raise InterruptedError(f'simulations cancelled with {len(pending)} of {len(seeds)} unfinished.')
+                done, _ = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+                for future in done:
+                    m, r = pending.pop(future)
+                    results[m][r] = future.result()
+                    if progress is not None:
+                        progress(len(seeds) - len(pending), len(seeds))
+        except BaseException:
+            [future.cancel() for future in pending]
+            raise
+    return results
+
+
+def main(
+        size_multipliers: List[int],
+        erase: bool = False,
+        num_simulations: int = NUM_SIMULATIONS,
+        time_steps: int = TIME_STEPS,
+        engine: str = ENGINE,
+        workers: Optional[int] = WORKERS,
+        save_results: bool = SAVE_RESULTS,
+        seed: int = 0,
+):
+    def report(done: int, total: int):
+        end = ',\n' if done % 20 == 0 or done == total else ', '
+        print(f'{done}/{total}', end=end)
+
+    print(f'Starting {num_simulations} simulations for each of the size multipliers {size_multipliers}.')
+    results = run_simulations(
+        size_multipliers,
+        num_simulations=num_simulations,
+        time_steps=time_steps,
+        engine=engine,
+        seed=seed,
+        workers=workers,
+        progress=report,
+    )
+    seeds = replica_seeds(seed, size_multipliers, num_simulations)
+    store: Optional[ResultsStore] = ResultsStore() if save_results else None
+    for size_multiplier, all_populations in results.items():
+        tree = prepare_plots_dir(size_multiplier, erase)
+        runs = [tree.new_run() for _ in all_populations]
+        [draw_plots(populations, run) for populations, run in zip(all_populations, runs)]
+        if store is not None:
+            # the spawn key locates the seed stream of each run under the root seed. See replica_seeds.
+            store.append(all_populations, [
+                {
+                    'size_multiplier': size_multiplier,
+                    'engine': engine,
+                    'seed': seed,
+                    'replica': r,
+                    'spawn_key': list(seeds[(size_multiplier, r)].spawn_key),
+                    'plots': runs[r].path,
+                    'params': model_params(),
+                }
+                for r in range(num_simulations)
+            ])
+    WRITER.wait()
+    return
+
+
+if __name__ == '__main__':
+    main(size_multipliers=[1, 2, 3, 4, 5])
@@ -0,0 +1,117 @@
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from utils import Size, sample_locations
+
+
+class School:
+    """ This class represents every fish of one species on the board as a struct of arrays.
+
+    Instead of one Python object per fish, the locations, eaten-flags, meal-counts and children of all fish are kept
+    in flat NumPy arrays, so that a whole cohort can be spawned, fed and reproduced with a handful of array operations.
+    The arrays are views into buffers that only grow, so memory stays linear in the largest population seen.
+    """
+    # names of the per-fish arrays of a school.
+    FIELDS: List[str] = ['x', 'y', 'got_eaten', 'num_eaten', 'children']
+
+    def __init__(self, fish_size: Size, fill: Tuple[int, int, int]):
+        """ Creates an empty school of fish.
+
+        :param fish_size: The (width, height) of each fish in the school.
+        :param fill: color with which to draw the living fish.
+        """
+        if any((f <= 0 for f in fish_size)):
+            raise ValueError(f'The width and height of the fish must be positive numbers. Got {fish_size} instead.')
+        self.size: Size = fish_size
+        self.fill: Tuple[int, int, int] = fill
+        self.outline: Tuple[int, int, int] = 0, 0, 0
+
+        self._capacity: int = 0
+        self._x: np.ndarray = np.empty(0, dtype=np.float64)
+        self._y: np.ndarray = np.empty(0, dtype=np.float64)
+        self._got_eaten: np.ndarray = np.empty(0, dtype=bool)
+        self._num_eaten: np.ndarray = np.empty(0, dtype=np.int32)
+        self._children: np.ndarray = np.empty(0, dtype=np.int32)
+        self._resize(0)
+
+    def __len__(self) -> int:
+        return self.x.shape[0]
+
+    @property
+    def width(self) -> float:
+        return self.size.width
+
+    @property
+    def height(self) -> float:
+        return self.size.height
+
+    def _reserve(self, n: int):
+        """ Makes sure the underlying buffers can hold at least n fish, growing them geometrically if needed. """
+        if n <= self._capacity:
+            return
+        capacity = max(n, 2 * self._capacity)
+        self._x = np.empty(capacity, dtype=np.float64)
+        self._y = np.empty(capacity, dtype=np.float64)
+        self._got_eaten = np.empty(capacity, dtype=bool)
+        self._num_eaten = np.empty(capacity, dtype=np.int32)
+        self._children = np.empty(capacity, dtype=np.int32)
+        self._capacity = capacity
+        return
+
+    def _resize(self, n: int):
+        """ Points the public arrays at the first n slots of the buffers. """
+        self._reserve(n)
+        self.x: np.ndarray = self._x[:n]
+        self.y: np.ndarray = self._y[:n]
+        self.got_eaten: np.ndarray = self._got_eaten[:n]
+        self.num_eaten: np.ndarray = self._num_eaten[:n]
+        self.children: np.ndarray = self._children[:n]
+        return
+
+    def spawn(self, n: int, board_size: Size, rng: np.random.Generator) -> 'School':
+        """ Replaces the school with n newly born fish dropped uniformly at random on the board.
+
+        :param n: number of fish to spawn.
+        :param board_size: The (width, height) of the board on which to drop the fish.
+        :param rng: the random number generator from which to draw the locations.
+        :return: the modified school.
+        """
+        if n < 0:
+            raise ValueError(f'Cannot spawn a negative number of fish. Got {n} instead.')
+        if any((f <= 0 for f in board_size)):
+            raise ValueError(f'The width and height of the board must be positive numbers. Got {board_size} instead.')
+
+        self._resize(n)
+        self.x[:], self.y[:] = sample_locations(rng, n, board_size, self.size)
+        self.got_eaten[:] = False
+        self.num_eaten[:] = 0
+        self.children[:] = 0
+        return self
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        """ The per-fish arrays of the school, by name. These are views, not copies. """
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    def restore(
+            self,
+            x: np.ndarray,
+            y: np.ndarray,
+            got_eaten: np.ndarray,
+            num_eaten: np.ndarray,
+            children: np.ndarray,
+    ) -> 'School':
+        """ Replaces the school with the fish described by the given arrays, which must all have the same length.
+
+        :return: the modified school.
+        """
+        n = len(x)
+        if any((len(a) != n for a in (y, got_eaten, num_eaten, children))):
+            raise ValueError(f'All the arrays of a school must have the same length.')
+
+        self._resize(n)
+        self.x[:], self.y[:] = x, y
+        self.got_eaten[:] = got_eaten
+        self.num_eaten[:] = num_eaten
+        self.children[:] = children
+        return self
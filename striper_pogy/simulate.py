@@ -1,13 +1,33 @@
-import pathlib
 import shutil
-from typing import Optional
-
-from PIL import Image
+import time
+from typing import Dict, List, Optional
 
+from animation import FrameSink, open_sink
+from array_board import ArrayBoard
+from checkpoint import load_checkpoint, restore, save_checkpoint
 from board import Board
+from ensemble import EnsembleBoard
+from horizon import Horizon, StopReport
+from markov import MarkovBoard, save_tables
+from outputs import OutputTree, RunDirectory
+from metrics import NullMetrics
 from params import *
+from plotting import WRITER
+from results import ResultsStore, model_params
 from utils import *
 
+# the population engines that track every fish, and so can draw the frames of an animation, by name.
+FISH_ENGINES = {
+    'objects': Board,
+    'arrays': ArrayBoard,
+}
+
+# the population engines that can run a simulation, by name.
+ENGINES = {
+    **FISH_ENGINES,
+    'markov': MarkovBoard,
+}
+
 
 def draw_population_plot(populations: np.array, filename: str):
     """ Draws a population vs time plot of the simulation.
@@ -22,7 +42,7 @@ def draw_population_plot(populations: np.array, filename: str):
         x_label='time',
         y_label='population',
         title='populations vs time',
-        plotpath=increment_filename(filename),
+        plotpath=filename,
     )
     return
 
@@ -36,7 +56,7 @@ def draw_phase_plot(populations: np.array, filename: str):
         x_label='pogies',
         y_label='stripers',
         title='striper population vs pogy population',
-        plotpath=increment_filename(filename),
+        plotpath=filename,
     )
     return
 
@@ -51,7 +71,7 @@ def draw_difference_plots(populations: np.array, prey_plot_path: str, predator_p
         x_label='population',
         y_label='delta',
         title='pogies difference vs population',
-        plotpath=increment_filename(prey_plot_path),
+        plotpath=prey_plot_path,
     )
 
     predator_population = populations[1, :][:-1]
@@ -62,57 +82,166 @@ def draw_difference_plots(populations: np.array, prey_plot_path: str, predator_p
         x_label='population',
         y_label='delta',
         title='stripers difference vs population',
-        plotpath=increment_filename(predator_plot_path),
+        plotpath=predator_plot_path,
     )
     return
 
 
-def simulate_once(size_multiplier: int, time_steps: int, gif_path: Optional[str] = None) -> np.array:
+def simulate_once(
+        size_multiplier: int,
+        time_steps: int,
+        gif_path: Optional[str] = None,
+        engine: str = ENGINE,
+        verbose: bool = True,
+        rng: Optional[np.random.Generator] = None,
+        metrics: Optional[NullMetrics] = None,
+        checkpoint_path: Optional[str] = None,
+        checkpoint_interval: float = CHECKPOINT_INTERVAL,
+        board_size: Size = BOARD_SIZE,
+        prey_capacity: int = PREY_CAPACITY,
+        horizon: Optional[Horizon] = None,
+        **board_kwargs,
+) -> np.array:
     """
     Runs a single simulation of the model.
 
     :param size_multiplier: size multiplier of board anc capacity.
     :param time_steps: Number of time steps for which to run the model.
-    :param gif_path: file path where the animation may be saved.
+    :param gif_path: file path where the animation may be saved. Its extension picks the format. See open_sink. Only
+                     the engines in FISH_ENGINES can be animated.
+    :param engine: name of the population engine to use. See ENGINES.
+    :param verbose: whether to print the number of each time step as it is simulated.
+    :param rng: the random number generator that drives the simulation.
+    :param metrics: optional StepMetrics that records the time and counters of each phase of every step.
+    :param checkpoint_path: optional .npz file path. If it holds a checkpoint, the simulation resumes from it. The
+                            simulation is checkpointed there as it runs, and the file is removed once it finishes.
+    :param checkpoint_interval: minimum number of seconds between checkpoints, which bounds the time spent saving them.
+    :param board_size: The (width, height) of the board before it is multiplied by the size multiplier.
+    :param prey_capacity: carrying capacity of the prey before it is multiplied by the square of the size multiplier.
+    :param horizon: optional Horizon that stops the simulation early once its populations no longer change in
+                    distribution, fills in the remaining time steps, and records why the simulation stopped.
+    :param board_kwargs: passed on to the board, e.g. fishery, reproduction_rate or food_requirement. See Board.
     """
     if time_steps < 1:
         raise ValueError(f'must simulate for at least one time step. Got {time_steps}')
+    if engine not in ENGINES:
+        raise ValueError(f'engine must be one of {list(ENGINES.keys())}. Got {engine} instead.')
+    if checkpoint_interval < 0:
+        raise ValueError(f'checkpoint interval must be non-negative. Got {checkpoint_interval} instead.')
+    if (checkpoint_path is not None) and (gif_path is not None):
+        raise ValueError(f'an animated simulation cannot be checkpointed, because the animation cannot be resumed.')
+    if (gif_path is not None) and (engine not in FISH_ENGINES):
+        raise ValueError(f'only the engines {list(FISH_ENGINES.keys())} have fish to animate. Got {engine} instead.')
 
-    bay = Board(
-        size=Size(BOARD_SIZE.width * size_multiplier, BOARD_SIZE.height * size_multiplier),
-        prey_capacity=PREY_CAPACITY * (size_multiplier ** 2),
+    bay = ENGINES[engine](
+        size=Size(board_size.width * size_multiplier, board_size.height * size_multiplier),
+        prey_capacity=prey_capacity * (size_multiplier ** 2),
+        rng=rng,
+        metrics=metrics,
+        **board_kwargs,
     )
     populations: np.array = np.zeros(shape=(2, time_steps))
-    images: List[Image] = list()
 
-    for i in range(time_steps):
-        end = ',\n' if (i + 1) % 20 == 0 else ', '
-        print(f'{i + 1}', end=end)
-        populations[:, i] = bay.step()
-        if gif_path is not None:
-            im = bay.draw()
-            images.append(im)
+    # the state of the board does not depend on the engine, so a simulation may be resumed with a different one.
+    settings = {
+        'size_multiplier': size_multiplier,
+        'time_steps': time_steps,
+        'board_size': list(board_size),
+        'prey_capacity': prey_capacity,
+        **board_kwargs,
+    }
+    start = 0
+    if (checkpoint_path is not None) and os.path.exists(checkpoint_path):
+        checkpoint = load_checkpoint(checkpoint_path)
+        if checkpoint.settings != settings:
+            raise ValueError(f'the checkpoint at {checkpoint_path} is for {checkpoint.settings}, not {settings}.')
+        restore(bay, checkpoint)
+        start = checkpoint.step
+        populations[:, :start] = checkpoint.populations
 
     # only create the animation if a path is provided.
+    sink: Optional[FrameSink] = None
     if gif_path is not None:
-        gif_path = increment_filename(gif_path)
-        images[0].save(
+        sink = open_sink(
             gif_path,
-            save_all=True,  # save all images in gif.
-            optimize=True,  # reduces final filesize of the gif.
-            append_images=images[1:],  # ordered list of other images.
+            every=ANIMATION_EVERY,
+            resolution=ANIMATION_RESOLUTION,
             duration=1_000 if size_multiplier > 1 else 1_500,  # each frame is shown for this many milliseconds.
         )
+
+    last_checkpoint = time.monotonic()
+    stop: Optional[StopReport] = None
+    try:
+        for i in range(start, time_steps):
+            if verbose:
+                end = ',\n' if (i + 1) % 20 == 0 else ', '
+                print(f'{i + 1}', end=end)
+            populations[:, i] = bay.step()
+            if (sink is not None) and sink.wants(i):
+                sink.add(i, bay.draw(sink.resolution))
+            if (checkpoint_path is not None) and (time.monotonic() - last_checkpoint >= checkpoint_interval):
+                save_checkpoint(checkpoint_path, bay, i + 1, populations, **settings)
+                last_checkpoint = time.monotonic()
+            if horizon is not None:
+                stop = horizon.check(populations, i + 1, bay.prey_capacity, bay.reproduction_rate)
+                if stop is not None:
+                    break
+    finally:
+        if sink is not None:
+            sink.close()
+
+    if (checkpoint_path is not None) and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    if horizon is not None:
+        report = horizon.finish(populations, stop)
+        if verbose and (stop is not None):
+            print(f'\nstopped after {report.step} of {time_steps} time steps ({report.reason}).')
     return populations
 
 
-def main(
+def simulate_ensemble(
         size_multiplier: int,
-        erase: bool = False,
-        animate: bool = ANIMATE,
-        num_simulations: int = NUM_SIMULATIONS,
-        time_steps: int = TIME_STEPS,
-):
+        time_steps: int,
+        num_replicas: int,
+        rng: Optional[np.random.Generator] = None,
+        metrics: Optional[NullMetrics] = None,
+) -> np.array:
+    """
+    Runs many independent simulations of the model together on an EnsembleBoard.
+
+    :param size_multiplier: size multiplier of board anc capacity.
+    :param time_steps: Number of time steps for which to run the model.
+    :param num_replicas: Number of simulations to run.
+    :param rng: the random number generator that drives the simulations.
+    :param metrics: optional StepMetrics that records the time and counters of each phase of every step.
+    :return: array of shape (num_replicas, 2, time_steps) with the populations of each simulation.
+    """
+    if time_steps < 1:
+        raise ValueError(f'must simulate for at least one time step. Got {time_steps}')
+
+    bays = EnsembleBoard(
+        size=Size(BOARD_SIZE.width * size_multiplier, BOARD_SIZE.height * size_multiplier),
+        prey_capacity=PREY_CAPACITY * (size_multiplier ** 2),
+        num_replicas=num_replicas,
+        rng=rng,
+        metrics=metrics,
+    )
+    populations: np.array = np.zeros(shape=(num_replicas, 2, time_steps))
+
+    for i in range(time_steps):
+        end = ',\n' if (i + 1) % 20 == 0 else ', '
+        print(f'{i + 1}', end=end)
+        populations[:, :, i] = bays.step()
+    return populations
+
+
+def prepare_plots_dir(size_multiplier: int, erase: bool = False) -> OutputTree:
+    """ Opens the tree of run directories for the plots of a size multiplier.
+
+    :param size_multiplier: size multiplier of board anc capacity.
+    :param erase: whether to remove old plots for this size multiplier.
+    :return: the tree in which to allocate a run directory for each simulation.
+    """
     if (not isinstance(size_multiplier, int)) or (size_multiplier < 1):
         raise ValueError(f'The Size Multiplier must be an integer, and be at least 1.')
 
@@ -120,27 +249,83 @@ def main(
     plots_dir = os.path.join(SIMULATIONS_PATH, f'multiplier_{size_multiplier}')
     if erase:
         shutil.rmtree(plots_dir)
-    plots_dir = os.path.join(SIMULATIONS_PATH, f'multiplier_{size_multiplier}', f'sim__0__')
-    pathlib.Path(plots_dir).mkdir(exist_ok=True, parents=True)
+    return OutputTree(plots_dir)
+
+
+# file names of the artifacts in each run directory, by kind.
+PLOT_FILENAMES: Dict[str, str] = {
+    'population': '1-populations-vs-time.png',
+    'phase': '2-phase-plot.png',
+    'prey_difference': '3-prey-difference.png',
+    'predator_difference': '4-predator-difference.png',
+    'gif': '5-animation.gif',
+}
 
-    # create file names for the first of each plot
-    population_path = os.path.join(plots_dir, '1-populations-vs-time.png')
-    phase_path = os.path.join(plots_dir, '2-phase-plot.png')
-    prey_difference_path = os.path.join(plots_dir, '3-prey-difference.png')
-    predator_difference_path = os.path.join(plots_dir, '4-predator-difference.png')
-    gif_path = os.path.join(plots_dir, '5-animation.gif')
+
+def draw_plots(populations: np.array, run: RunDirectory):
+    """ Draws all the plots for one simulation into its run directory. """
+    paths = {kind: run.artifact(PLOT_FILENAMES[kind], kind) for kind in PLOT_FILENAMES if kind != 'gif'}
+    draw_population_plot(populations, paths['population'])
+    draw_phase_plot(populations, paths['phase'])
+    draw_difference_plots(populations, paths['prey_difference'], paths['predator_difference'])
+    return
+
+
+def main(
+        size_multiplier: int,
+        erase: bool = False,
+        animate: bool = ANIMATE,
+        num_simulations: int = NUM_SIMULATIONS,
+        time_steps: int = TIME_STEPS,
+        engine: str = ENGINE,
+        ensemble: bool = ENSEMBLE,
+        save_results: bool = SAVE_RESULTS,
+        seed: int = 0,
+):
+    if animate and (not ensemble) and (engine not in FISH_ENGINES):
+        raise ValueError(f'only the engines {list(FISH_ENGINES.keys())} have fish to animate. Got {engine} instead. '
+                         f'Run it with animate=False.')
+    tree = prepare_plots_dir(size_multiplier, erase)
 
     # run simulation for the requested number of times.
-    np.random.seed(0)
+    rng = np.random.default_rng(seed)
+    if ensemble:
+        print(f'Starting {num_simulations} simulations together, with size multiplier {size_multiplier}.')
+        all_populations = simulate_ensemble(size_multiplier, time_steps, num_simulations, rng=rng)
+    else:
+        all_populations = np.zeros(shape=(num_simulations, 2, time_steps))
+
+    runs: List[RunDirectory] = list()
     for i in range(num_simulations):
-        print(f'Starting simulation number {i + 1}, with size multiplier {size_multiplier}.')
-        if (i == 0) and animate:
-            populations = simulate_once(size_multiplier=size_multiplier, time_steps=time_steps, gif_path=gif_path)
+        run = tree.new_run()
+        if ensemble:
+            populations = all_populations[i]
+        elif (i == 0) and animate:
+            print(f'Starting simulation number {i + 1}, with size multiplier {size_multiplier}.')
+            gif_path = run.artifact(PLOT_FILENAMES['gif'], 'gif')
+            populations = simulate_once(size_multiplier, time_steps, gif_path=gif_path, engine=engine, rng=rng)
         else:
-            populations = simulate_once(size_multiplier=size_multiplier, time_steps=time_steps, gif_path=None)
-        draw_population_plot(populations, population_path)
-        draw_phase_plot(populations, phase_path)
-        draw_difference_plots(populations, prey_difference_path, predator_difference_path)
+            print(f'Starting simulation number {i + 1}, with size multiplier {size_multiplier}.')
+            populations = simulate_once(size_multiplier, time_steps, gif_path=None, engine=engine, rng=rng)
+        draw_plots(populations, run)
+        all_populations[i] = populations
+        runs.append(run)
+
+    if save_results:
+        # every simulation draws from the same generator, so a run is identified by the seed and its position.
+        ResultsStore().append(all_populations, [
+            {
+                'size_multiplier': size_multiplier,
+                'engine': 'ensemble' if ensemble else engine,
+                'seed': seed,
+                'replica': i,
+                'plots': runs[i].path,
+                'params': model_params(),
+            }
+            for i in range(num_simulations)
+        ])
+    save_tables()
+    WRITER.wait()
     return
 
 
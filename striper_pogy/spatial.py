@@ -0,0 +1,74 @@
+from typing import List, Tuple
+
+import numpy as np
+
+from utils import Size
+
+
+class CellGrid:
+    """ A uniform grid (cell-list) index over a set of points on the board.
+
+    The board is cut into cells of a given size and the points are bucketed by the cell they fall in.
+    If the cell size is at least the largest distance, along each axis, at which two fish can touch, then every fish
+    touching a query fish lies in the 3x3 block of cells around the query, so only those cells need to be checked.
+    """
+    def __init__(self, x: np.ndarray, y: np.ndarray, cell_size: Size, board_size: Size):
+        """ Buckets the given points into cells.
+
+        :param x: x-coordinates of the points to index.
+        :param y: y-coordinates of the points to index.
+        :param cell_size: The (width, height) of each cell.
+        :param board_size: The (width, height) of the board on which the points lie.
+        """
+        if any((c <= 0 for c in cell_size)):
+            raise ValueError(f'The width and height of the cells must be positive numbers. Got {cell_size} instead.')
+        self.cell_size: Size = cell_size
+        self.num_columns: int = int(board_size.width // cell_size.width) + 1
+        self.num_rows: int = int(board_size.height // cell_size.height) + 1
+
+        keys = self._keys(*self._cells(np.asarray(x, dtype=float), np.asarray(y, dtype=float)))
+        self.order: np.ndarray = np.argsort(keys)
+        counts = np.bincount(keys, minlength=self.num_columns * self.num_rows)
+        self.offsets: np.ndarray = np.concatenate(([0], np.cumsum(counts)))
+
+    def _cells(self, x: np.ndarray, y: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        columns = np.clip((x // self.cell_size.width).astype(np.int64), 0, self.num_columns - 1)
+        rows = np.clip((y // self.cell_size.height).astype(np.int64), 0, self.num_rows - 1)
+        return columns, rows
+
+    def _keys(self, columns: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        return columns * self.num_rows + rows
+
+    def pairs(self, x: np.ndarray, y: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """ Finds the indexed points in the 3x3 block of cells around each query point.
+
+        :param x: x-coordinates of the query points.
+        :param y: y-coordinates of the query points.
+        :return: parallel arrays of query indices and point indices for every candidate pair, sorted by query index.
+        """
+        columns, rows = self._cells(np.asarray(x, dtype=float), np.asarray(y, dtype=float))
+        shifts = np.arange(-1, 2)
+        columns = (columns[:, None, None] + shifts[None, :, None]).repeat(3, axis=2).reshape(-1, 9)
+        rows = (rows[:, None, None] + shifts[None, None, :]).repeat(3, axis=1).reshape(-1, 9)
+        inside = (0 <= columns) & (columns < self.num_columns) & (0 <= rows) & (rows < self.num_rows)
+
+        keys = self._keys(columns, rows)[inside]
+        starts, stops = self.offsets[keys], self.offsets[keys + 1]
+        lengths = stops - starts
+
+        queries = np.repeat(np.nonzero(inside)[0], lengths)
+        # position of each pair within the run of points of its cell, added to the start of that cell.
+        run_starts = np.repeat(np.cumsum(lengths) - lengths, lengths)
+        positions = np.repeat(starts, lengths) + np.arange(queries.shape[0]) - run_starts
+        return queries, self.order[positions]
+
+    def candidates(self, x: np.ndarray, y: np.ndarray) -> List[np.ndarray]:
+        """ Finds the indexed points in the 3x3 block of cells around each query point.
+
+        :param x: x-coordinates of the query points.
+        :param y: y-coordinates of the query points.
+        :return: a List with, for each query point, an array of the indices of its candidate points.
+        """
+        queries, points = self.pairs(x, y)
+        boundaries = np.searchsorted(queries, np.arange(1, len(x)))
+        return np.split(points, boundaries)
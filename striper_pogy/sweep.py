@@ -0,0 +1,313 @@
+import hashlib
+import itertools
+import json
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, Future, FIRST_COMPLETED, wait
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from horizon import Horizon, StopReport
+from markov import save_tables
+from params import *
+from simulate import simulate_once
+from utils import CACHE_PATH, Size
+
+# the parameters that a sweep can vary, with their default values.
+DEFAULTS: Dict[str, Any] = {
+    'size_multiplier': 1,
+    'time_steps': TIME_STEPS,
+    'engine': 'arrays',
+    'board_size': BOARD_SIZE,
+    'prey_capacity': PREY_CAPACITY,
+    'reproduction_rate': PREY_REPRODUCTION_RATE,
+    'food_requirement': PREDATOR_FOOD_REQUIREMENTS,
+    'fishery': FISHERY,
+    'starting_prey': STARTING_PREY,
+    'starting_predators': STARTING_PREDATORS,
+}
+
+# source files whose contents decide the results of a simulation. Editing any of them invalidates the cache.
+SOURCE_FILES: List[str] = [
+    'array_board.py',
+    'board.py',
+    'ensemble.py',
+    'fish.py',
+    'horizon.py',
+    'markov.py',
+    'school.py',
+    'simulate.py',
+    'spatial.py',
+    'utils.py',
+]
+
+
+def grid(**values: List[Any]) -> List[Dict[str, Any]]:
+    """ Every combination of the given values of the parameters, e.g. grid(fishery=[None, 0.1], size_multiplier=[1, 2]).
+
+    :param values: the values of each parameter. See DEFAULTS for the parameters.
+    :return: one point per combination.
+    """
+    names = list(values.keys())
+    return [dict(zip(names, combination)) for combination in itertools.product(*values.values())]
+
+
+def complete(point: Dict[str, Any]) -> Dict[str, Any]:
+    """ The point with every parameter it does not set taken from DEFAULTS, in a form that can be written as JSON. """
+    unknown = set(point.keys()) - set(DEFAULTS.keys())
+    if unknown:
+        raise ValueError(f'unknown parameters {sorted(unknown)}. The parameters are {list(DEFAULTS.keys())}.')
+    point = {**DEFAULTS, **point}
+    point['board_size'] = list(point['board_size'])
+    return point
+
+
+def code_version() -> str:
+    """ A hash of the source files that decide the results of a simulation. """
+    digest = hashlib.sha256()
+    for filename in SOURCE_FILES:
+        with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), filename), 'rb') as fp:
+            digest.update(filename.encode() + b'\0' + fp.read())
+    return digest.hexdigest()
+
+
+def cache_key(
+        point: Dict[str, Any],
+        seed: int,
+        replica: int,
+        code: str,
+        horizon: Optional[Dict[str, Any]] = None,
+) -> str:
+    """ The name under which the populations of one replica of a point are cached.
+
+    :param point: the completed point. See complete.
+    :param seed: root seed of the sweep.
+    :param replica: index of the replica.
+    :param code: version of the code. See code_version.
+    :param horizon: the arguments of the Horizon that may stop the replica early, if any.
+    :return: hex digest of everything that decides the populations.
+    """
+    payload = {
+        'point': point,
+        'seed': seed,
+        'replica': replica,
+        'code': code,
+        'fish_sizes': [list(PREY_SIZE), list(PREDATOR_SIZE)],
+    }
+    if point['engine'] == 'markov':
+        payload['markov_samples'] = MARKOV_SAMPLES
+    if horizon is not None:
+        payload['horizon'] = {'window': HORIZON_WINDOW, 'threshold': HORIZON_THRESHOLD, **horizon}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+def _run_replica(
+        point: Dict[str, Any],
+        seed: int,
+        replica: int,
+        horizon: Optional[Dict[str, Any]] = None,
+) -> Tuple[np.array, Optional[StopReport]]:
+    """ Runs one replica of a point in a worker process.
+
+    Replica r of every point draws from the same stream, spawned from the root seed, so comparisons between points
+    are made with common random numbers.
+
+    :return: the populations, and the report of the Horizon if one was asked for.
+    """
+    rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(replica,)))
+    stopper = None if horizon is None else Horizon(**horizon)
+    try:
+        populations = simulate_once(
+            point['size_multiplier'],
+            point['time_steps'],
+            engine=point['engine'],
+            verbose=False,
+            rng=rng,
+            board_size=Size(*point['board_size']),
+            prey_capacity=point['prey_capacity'],
+            reproduction_rate=point['reproduction_rate'],
+            food_requirement=point['food_requirement'],
+            fishery=point['fishery'],
+            starting_prey=point['starting_prey'],
+            starting_predators=point['starting_predators'],
+            horizon=stopper,
+        )
+    finally:
+        save_tables()  # exit handlers may never run in a worker process.
+    return populations, None if stopper is None else stopper.reports[-1]
+
+
+def _save(path: str, populations: np.array, report: Optional[StopReport]):
+    """ Writes a cache entry next to its final path and then moves it into place, so entries are never partial.
+
+    The report of the Horizon, if any, is written first as JSON next to the populations, so an entry that exists
+    always has its report.
+    """
+    temp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    if report is not None:
+        with open(temp_path, 'w') as fp:
+            json.dump(report._asdict(), fp)
+        os.replace(temp_path, _report_path(path))
+    with open(temp_path, 'wb') as fp:
+        np.save(fp, populations)
+    os.replace(temp_path, path)
+    return
+
+
+def _report_path(path: str) -> str:
+    return path[:-len('.npy')] + '.json'
+
+
+def _cache_paths(
+        points: List[Dict[str, Any]],
+        num_simulations: int,
+        seed: int,
+        horizon: Optional[Dict[str, Any]],
+        cache_dir: str,
+) -> List[List[str]]:
+    """ The path of the cache entry of each replica of each completed point. """
+    code = code_version()
+    return [
+        [os.path.join(cache_dir, cache_key(point, seed, r, code, horizon) + '.npy') for r in range(num_simulations)]
+        for point in points
+    ]
+
+
+def sweep(
+        points: List[Dict[str, Any]],
+        *,  # any arguments after '*' must be passed by name.
+        num_simulations: int = NUM_SIMULATIONS,
+        seed: int = 0,
+        workers: Optional[int] = WORKERS,
+        horizon: Optional[Dict[str, Any]] = None,
+        cache_dir: str = CACHE_PATH,
+        progress: Optional[Callable[[int, int], None]] = None,
+        cancel: Optional[threading.Event] = None,
+) -> List[np.array]:
+    """
+    Runs every replica of every point, reusing the replicas already in the cache and running the rest in parallel.
+
+    A replica is cached under a hash of its completed point, the seed, its index and the version of the code, so
+    repeated and overlapping sweeps only run what is missing, and any change to the simulation code starts afresh.
+
+    :param points: the parameters of each point, e.g. from grid. Parameters a point does not set take their defaults.
+    :param num_simulations: number of replicas for each point.
+    :param seed: root seed for the whole sweep.
+    :param workers: number of worker processes. None uses every core.
+    :param horizon: optional arguments of a Horizon, which stops each replica early once it has converged. See
+                    stop_reports for why and when each replica stopped.
+    :param cache_dir: directory of the cache.
+    :param progress: optional callback, called with (number finished, total number) after each replica finishes.
+    :param cancel: optional event. When it is set, replicas that have not started are cancelled and the sweep stops.
+    :return: for each point, an array of shape (num_simulations, 2, time_steps).
+    """
+    if num_simulations < 1:
+        raise ValueError(f'must run at least one simulation. Got {num_simulations}')
+    points = [complete(point) for point in points]
+    os.makedirs(cache_dir, exist_ok=True)
+
+    if horizon is not None:
+        Horizon(**horizon)  # fail fast on bad arguments, rather than in every worker.
+
+    paths = _cache_paths(points, num_simulations, seed, horizon, cache_dir)
+    results: List[np.array] = [np.zeros(shape=(num_simulations, 2, p['time_steps'])) for p in points]
+    missing: Dict[str, List[Tuple[int, int]]] = dict()
+    for i, point in enumerate(points):
+        for r, path in enumerate(paths[i]):
+            if os.path.exists(path):
+                results[i][r] = np.load(path)
+            else:
+                # points repeated within the sweep are only run once.
+                missing.setdefault(path, list()).append((i, r))
+
+    total, done = len(missing), 0
+    if progress is not None:
+        progress(done, total)
+    if not missing:
+        return results
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending: Dict[Future, str] = {
+            executor.submit(_run_replica, points[targets[0][0]], seed, targets[0][1], horizon): path
+            for path, targets in missing.items()
+        }
+        try:
+            while pending:
+                if (cancel is not None) and cancel.is_set():
+                    raise InterruptedError(f'sweep cancelled with {len(pending)} of {total} replicas unfinished.')
+                finished, _ = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    path = pending.pop(future)
+                    populations, report = future.result()
+                    _save(path, populations, report)
+                    for i, r in missing[path]:
+                        results[i][r] = populations
+                    done += 1
+                    if progress is not None:
+                        progress(done, total)
+        except BaseException:
+            [future.cancel() for future in pending]
+            raise
+    return results
+
+
+def stop_reports(
+        points: List[Dict[str, Any]],
+        horizon: Dict[str, Any],
+        *,  # any arguments after '*' must be passed by name.
+        num_simulations: int = NUM_SIMULATIONS,
+        seed: int = 0,
+        cache_dir: str = CACHE_PATH,
+) -> List[List[StopReport]]:
+    """ Why and when each replica of a sweep run with a Horizon stopped.
+
+    :param points: the points of the sweep.
+    :param horizon: the arguments of the Horizon, as given to sweep.
+    :param num_simulations: number of replicas for each point.
+    :param seed: root seed of the sweep.
+    :param cache_dir: directory of the cache.
+    :return: for each point, the report of each of its replicas.
+    """
+    reports: List[List[StopReport]] = list()
+    for point_paths in _cache_paths([complete(p) for p in points], num_simulations, seed, horizon, cache_dir):
+        point_reports: List[StopReport] = list()
+        for path in point_paths:
+            with open(_report_path(path)) as fp:
+                point_reports.append(StopReport(**json.load(fp)))
+        reports.append(point_reports)
+    return reports
+
+
+def main(
+        fisheries: List[Optional[float]],
+        size_multiplier: int = 1,
+        num_simulations: int = NUM_SIMULATIONS,
+        time_steps: int = TIME_STEPS,
+        workers: Optional[int] = WORKERS,
+        horizon: Optional[Dict[str, Any]] = None,
+):
+    def report(done: int, total: int):
+        end = ',\n' if done % 20 == 0 or done == total else ', '
+        print(f'{done}/{total}', end=end)
+
+    points = grid(fishery=fisheries, size_multiplier=[size_multiplier], time_steps=[time_steps])
+    print(f'Sweeping {len(points)} fishery fractions with {num_simulations} simulations each.')
+    results = sweep(points, num_simulations=num_simulations, workers=workers, horizon=horizon, progress=report)
+    for point, populations in zip(points, results):
+        prey, predators = populations[:, :, -1].mean(axis=0)
+        print(f'fishery {point["fishery"]}: mean final prey {prey:.1f}, mean final predators {predators:.1f}')
+
+    if horizon is not None:
+        reports = stop_reports(points, horizon, num_simulations=num_simulations)
+        for point, point_reports in zip(points, reports):
+            reasons = [r.reason for r in point_reports]
+            steps = np.mean([r.step for r in point_reports])
+            counts = {reason: reasons.count(reason) for reason in sorted(set(reasons))}
+            print(f'fishery {point["fishery"]}: stopped after {steps:.0f} time steps on average, {counts}')
+    return
+
+
+if __name__ == '__main__':
+    main(fisheries=[None, 0.05, 0.1, 0.2, 0.3])
+    # main(fisheries=[None, 0.05, 0.1, 0.2, 0.3], time_steps=2_000, horizon={'fill': 'repeat'})
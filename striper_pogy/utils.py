@@ -1,32 +1,39 @@
 import os
+import sys
 from collections import namedtuple
 from typing import Tuple, List
 
 import numpy as np
-from matplotlib import pyplot as plt
+from matplotlib.axes import Axes
+
+from plotting import FIGURES, WRITER
+
+# draw_trajectories is shared with difference_equations. See shared/README.md.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'shared'))
+from trajectories import draw_trajectories  # noqa: E402
 
 Size = namedtuple('Size', 'width height')  # for the sizes of the board and the fish.
 Location = namedtuple('Location', 'x y')  # for the locations of the fish on the board.
 
 PLOTS_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), 'plots'))
 SIMULATIONS_PATH = os.path.join(PLOTS_PATH, 'simulations')
+RESULTS_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), 'results'))
+TABLES_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), 'tables'))
+CACHE_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), 'cache'))
 
 
-def increment_filename(filepath: str):
-    """ Increments the filepath by 1 until the new filepath does not exist.
+def sample_locations(rng: np.random.Generator, n: int, board_size: Size, fish_size: Size) -> Tuple[np.array, np.array]:
+    """ Uniform random locations for n fish of the given size, so that each fish lies entirely on the board.
 
-    The expected format is '{directory}__{number}__{filename}.{extension}'.
+    :param rng: the random number generator to draw from.
+    :param n: number of locations to draw.
+    :param board_size: The (width, height) of the board.
+    :param fish_size: The (width, height) of the fish.
+    :return: arrays of the x-coordinates and y-coordinates of the locations.
     """
-    while os.path.exists(filepath):
-        parts = filepath.split('.')
-        prefix, extension = '.'.join(parts[:-1]), parts[-1]
-        parts = prefix.split('__')
-        filepath = f'{parts[0]}__{int(parts[1]) + 1}__{parts[2]}.{extension}'
-
-    path_parts = filepath.split('/')
-    plotdir = '/'.join(path_parts[:-1])
-    os.makedirs(plotdir, exist_ok=True)
-    return filepath
+    x = rng.uniform(low=fish_size.width / 2, high=board_size.width - fish_size.width / 2, size=n)
+    y = rng.uniform(low=fish_size.height / 2, high=board_size.height - fish_size.height / 2, size=n)
+    return x, y
 
 
 def limits(min_x: int, max_x: int) -> Tuple[int, int]:
@@ -35,11 +42,11 @@ def limits(min_x: int, max_x: int) -> Tuple[int, int]:
     return (min_x // factor - 1) * factor, min_x + factor * (1 + (max_x - min_x) // factor)
 
 
-def _add_labels(x_label, y_label, title, plotpath):
-    plt.xlabel(x_label)
-    plt.ylabel(y_label)
-    plt.title(title)
-    plt.savefig(plotpath, bbox_inches='tight', pad_inches=0.25)
+def _add_labels(ax: Axes, x_label, y_label, title, plotpath):
+    ax.set_xlabel(x_label)
+    ax.set_ylabel(y_label)
+    ax.set_title(title)
+    WRITER.save(ax.figure, plotpath)
     return
 
 
@@ -73,11 +80,20 @@ def line_plot(
     if not all((len(y) == len(x) for y in ys)):
         raise ValueError(f'All curves must have the same number of points as x-values. In this cane, {len(x)}.')
 
-    fig = plt.figure(figsize=(16, 10), dpi=200)
-    fig.add_subplot(111)
-    [plt.plot(x, ys[i], c=colors[i], label=labels[i], lw=1.) for i in range(len(colors))]
-    _add_labels(x_label, y_label, title, plotpath)
-    plt.close(fig)
+    _, ax = FIGURES.get('line')
+    lines = FIGURES.artists.get('line')
+    if (lines is None) or (len(lines) != len(ys)):
+        ax.clear()
+        lines = [ax.plot(x, ys[i], c=colors[i], label=labels[i], lw=1.)[0] for i in range(len(colors))]
+        FIGURES.artists['line'] = lines
+    else:
+        for line, y, color, label in zip(lines, ys, colors, labels):
+            line.set_data(x, y)
+            line.set_color(color)
+            line.set_label(label)
+        ax.relim()
+        ax.autoscale_view()
+    _add_labels(ax, x_label, y_label, title, plotpath)
     return
 
 
@@ -89,7 +105,7 @@ def arrow_plot(
         title: str,
         plotpath: str,
 ):
-    """ Plots continuous lines from the given data.
+    """ Plots the path through the given points, with arrowheads along it to show its direction. See draw_trajectories.
 
     :param x: array of x-values.
     :param y: array of y-values.
@@ -103,10 +119,11 @@ def arrow_plot(
     if x.shape != y.shape:
         raise ValueError(f'x and y must have the same shape. Got x {x.shape} and y {y.shape} instead.')
 
-    fig = plt.figure(figsize=(16, 10), dpi=200)
-    fig.add_subplot(111)
-    plt.quiver(x[:-1], y[:-1], x[1:] - x[:-1], y[1:] - y[:-1],
-               scale_units='xy', angles='xy', scale=1, width=0.003)
-    _add_labels(x_label, y_label, title, plotpath)
-    plt.close(fig)
+    _, ax = FIGURES.get('arrow')
+    previous = FIGURES.artists.get('arrow')
+    if previous is not None:
+        [artist.remove() for artist in previous]
+    ax.ignore_existing_data_limits = True
+    FIGURES.artists['arrow'] = draw_trajectories(ax, [np.stack([x, y])], linewidth=1.)
+    _add_labels(ax, x_label, y_label, title, plotpath)
     return